@@ -1,8 +1,11 @@
 from datetime import datetime
 
+from django.utils.functional import SimpleLazyObject
+
 
 def year(request):
-    """Добавляет в контекст шаблона страницы переменную year."""
-    current_year = datetime.now().year
+    """Добавляет в контекст шаблона страницы переменную year.
 
-    return {'year': current_year}
+    Год вычисляется, только если шаблон его выводит.
+    """
+    return {'year': SimpleLazyObject(lambda: datetime.now().year)}
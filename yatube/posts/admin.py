@@ -1,6 +1,9 @@
 from django.contrib import admin
+from django.db.models import Case, IntegerField, When
 
+from . import constants
 from .models import Post, Group
+from .search import get_search_backend
 
 
 @admin.register(Post)
@@ -19,6 +22,26 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по полнотекстовому индексу вместо LIKE по тексту."""
+        if not search_term:
+            return super().get_search_results(
+                request, queryset, search_term)
+        ids = get_search_backend().search(
+            search_term, constants.SEARCH_RESULTS_LIMIT)
+        rank = Case(
+            *[When(pk=pk, then=position) for position, pk in enumerate(ids)],
+            output_field=IntegerField())
+        queryset = queryset.filter(pk__in=ids).annotate(search_rank=rank)
+
+        return queryset, False
+
+    def get_ordering(self, request):
+        """При поиске сортирует по релевантности."""
+        if request.GET.get('q'):
+            return ('search_rank',)
+        return super().get_ordering(request)
+
 
 @admin.register(Group)
 class GroupAdmin(admin.ModelAdmin):
@@ -0,0 +1,291 @@
+"""JSON API постов, групп, комментариев и профилей.
+
+Выборки те же, что у HTML-страниц, списки листаются курсорами
+KeysetPaginator. Параметр ?fields=id,text оставляет в ответе только
+перечисленные поля. Объекты сериализуются набором функций-геттеров,
+выбранных один раз на запрос, без шаблонов и форм; формы нужны
+только для проверки данных при записи.
+
+Запись — для вошедших пользователей по сессии, с обычной защитой
+CSRF. Тело запроса принимается в JSON или как данные формы.
+Посты и комментарии создаются в пределах тех же бюджетов частоты,
+что и через HTML-формы.
+"""
+import json
+from functools import wraps
+
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse, QueryDict
+from django.shortcuts import get_object_or_404
+
+from . import constants
+from .caching import cache_feed_page, conditional_feed_page
+from .forms import CommentForm, PostForm
+from .groups import attach_groups, get_group_or_404, get_groups
+from .models import Post, User
+from .paginator import KeysetPaginator
+from .ratelimit import rate_limit
+from .routers import read_from_replica
+from .utils import get_comments_page, get_profile
+
+POST_FIELDS = {
+    'id': lambda post: post.pk,
+    'text': lambda post: post.text,
+    'pub_date': lambda post: post.pub_date.isoformat(),
+    'author': lambda post: post.author.username,
+    'group': lambda post: post.group.slug if post.group_id else None,
+    'image': lambda post: post.image.url if post.image else None,
+    'comments_count': lambda post: post.comments_count,
+}
+GROUP_FIELDS = {
+    'id': lambda group: group.pk,
+    'slug': lambda group: group.slug,
+    'title': lambda group: group.title,
+    'description': lambda group: group.description,
+}
+COMMENT_FIELDS = {
+    'id': lambda comment: comment.pk,
+    'post': lambda comment: comment.post_id,
+    'author': lambda comment: comment.author.username,
+    'text': lambda comment: comment.text,
+    'created': lambda comment: comment.created.isoformat(),
+}
+PROFILE_FIELDS = {
+    'username': lambda user: user.username,
+    'full_name': lambda user: user.get_full_name(),
+    'posts_count': lambda user: get_profile(user).posts_count,
+    'followers_count': lambda user: get_profile(user).followers_count,
+}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.details = details
+
+    def response(self):
+        return JsonResponse({'error': self.message, **self.details},
+                            status=self.status)
+
+
+class Serializer:
+    """Превращает объекты в словари из полей, запрошенных в ?fields=."""
+
+    def __init__(self, getters, request):
+        requested = request.GET.get('fields')
+        if not requested:
+            self.names = list(getters)
+        else:
+            self.names = [name.strip() for name in requested.split(',')
+                          if name.strip()]
+            unknown = [name for name in self.names if name not in getters]
+            if unknown:
+                raise ApiError(400, 'Неизвестные поля.', fields=unknown)
+        self.getters = [(name, getters[name]) for name in self.names]
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __call__(self, obj):
+        return {name: getter(obj) for name, getter in self.getters}
+
+
+def api_view(*methods):
+    """Проверяет метод и вход, переводит ошибки в ответы JSON."""
+    allowed = set(methods) | ({'HEAD'} if 'GET' in methods else set())
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in allowed:
+                response = JsonResponse(
+                    {'error': 'Метод не поддерживается.'}, status=405)
+                response['Allow'] = ', '.join(sorted(allowed))
+                return response
+            if (request.method not in ('GET', 'HEAD')
+                    and not request.user.is_authenticated):
+                return ApiError(401, 'Нужно войти.').response()
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                return error.response()
+            except Http404:
+                return ApiError(404, 'Не найдено.').response()
+            except PermissionDenied:
+                return ApiError(403, 'Нет прав.').response()
+
+        return wrapper
+
+    return decorator
+
+
+def request_data(request):
+    """Данные из тела запроса: JSON или данные формы."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ApiError(400, 'Тело запроса — не JSON.')
+        if not isinstance(data, dict):
+            raise ApiError(400, 'Ожидается объект JSON.')
+        return data
+    if request.method == 'POST':
+        return request.POST.dict()
+    return QueryDict(request.body).dict()
+
+
+def form_errors(form):
+    return ApiError(400, 'Ошибка в данных.',
+                    errors=form.errors.get_json_data())
+
+
+def check_strings(data, *names):
+    """Поля names, если они переданы, — строки или null."""
+    wrong = [name for name in names
+             if data.get(name) is not None
+             and not isinstance(data[name], str)]
+    if wrong:
+        raise ApiError(400, 'Поля должны быть строками.', fields=wrong)
+
+
+def post_form_data(data, post=None):
+    """Данные для PostForm: группа по slug, прочее — как есть."""
+    check_strings(data, 'text', 'group')
+    values = {
+        'text': post.text if post else '',
+        'group': post.group_id if post else None,
+    }
+    if 'text' in data:
+        values['text'] = data['text']
+    if 'group' in data:
+        slug = data['group']
+        try:
+            values['group'] = get_group_or_404(slug).pk if slug else None
+        except Http404:
+            raise ApiError(400, 'Неизвестная группа.', group=slug)
+    if values['group'] is None:
+        values['group'] = ''
+
+    return values
+
+
+def too_many_requests(request, retry_after):
+    return ApiError(429, 'Слишком много запросов.',
+                    retry_after=retry_after).response()
+
+
+def page_response(page, serialize):
+    return JsonResponse({
+        'results': [serialize(obj) for obj in page.object_list],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
+
+
+def post_response(post, request, status=200):
+    return JsonResponse(Serializer(POST_FIELDS, request)(post),
+                        status=status)
+
+
+@api_view('GET', 'POST')
+@rate_limit('post_create', respond=too_many_requests)
+@read_from_replica
+@conditional_feed_page
+@cache_feed_page
+def posts(request):
+    """Лента постов с фильтрами ?group= и ?author=; POST создаёт пост."""
+    if request.method == 'POST':
+        form = PostForm(post_form_data(request_data(request)))
+        if not form.is_valid():
+            raise form_errors(form)
+        post_object = form.save(commit=False)
+        post_object.author = request.user
+        post_object.save()
+        return post_response(post_object, request, status=201)
+    serialize = Serializer(POST_FIELDS, request)
+    post_list = Post.objects.for_feed()
+    if request.GET.get('group'):
+        post_list = post_list.filter(
+            group=get_group_or_404(request.GET['group']))
+    if request.GET.get('author'):
+        post_list = post_list.filter(author__username=request.GET['author'])
+    paginator = KeysetPaginator(post_list, constants.POSTS_PER_PAGE)
+    page = paginator.get_cursor_page(request.GET.get('cursor'))
+    if 'group' in serialize:
+        attach_groups(page.object_list)
+
+    return page_response(page, serialize)
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+@read_from_replica
+def post(request, post_id):
+    """Пост; автор может изменить его (PATCH) или удалить (DELETE)."""
+    post_object = get_object_or_404(Post.objects.for_detail(), id=post_id)
+    if request.method in ('GET', 'HEAD'):
+        return post_response(post_object, request)
+    if post_object.author != request.user:
+        raise PermissionDenied
+    if request.method == 'DELETE':
+        post_object.delete()
+        return HttpResponse(status=204)
+    form = PostForm(post_form_data(request_data(request), post_object),
+                    instance=post_object)
+    if not form.is_valid():
+        raise form_errors(form)
+    post_object = form.save(commit=False)
+    post_object.save(update_fields=PostForm.Meta.fields)
+
+    return post_response(post_object, request)
+
+
+@api_view('GET', 'POST')
+@rate_limit('add_comment', respond=too_many_requests)
+@read_from_replica
+def comments(request, post_id):
+    """Комментарии поста, от новых к старым; POST добавляет комментарий."""
+    post_object = get_object_or_404(Post.objects.only('pk'), id=post_id)
+    if request.method == 'POST':
+        data = request_data(request)
+        check_strings(data, 'text')
+        form = CommentForm(data)
+        if not form.is_valid():
+            raise form_errors(form)
+        comment = form.save(commit=False)
+        comment.author = request.user
+        comment.post = post_object
+        comment.save()
+        return JsonResponse(Serializer(COMMENT_FIELDS, request)(comment),
+                            status=201)
+    serialize = Serializer(COMMENT_FIELDS, request)
+
+    return page_response(
+        get_comments_page(post_object, request.GET.get('cursor')),
+        serialize)
+
+
+@api_view('GET')
+def groups(request):
+    """Все группы из справочника."""
+    serialize = Serializer(GROUP_FIELDS, request)
+
+    return JsonResponse(
+        {'results': [serialize(group) for group in get_groups()]})
+
+
+@api_view('GET')
+def group(request, slug):
+    return JsonResponse(
+        Serializer(GROUP_FIELDS, request)(get_group_or_404(slug)))
+
+
+@api_view('GET')
+@read_from_replica
+def profile(request, username):
+    """Профиль автора со счётчиками; посты — в posts/?author=."""
+    author = get_object_or_404(User.objects.select_related('profile'),
+                               username=username)
+
+    return JsonResponse(Serializer(PROFILE_FIELDS, request)(author))
@@ -0,0 +1,88 @@
+"""Чтение и запись архивов постов в JSONL и CSV.
+
+Строка архива: text, pub_date (ISO 8601), author (username),
+group (slug или пусто), image (путь к файлу или пусто).
+Файлы читаются и пишутся построчно, целиком в память не попадают.
+"""
+import csv
+import json
+
+from django.db import transaction
+
+from .models import Post
+
+FIELDS = ('text', 'pub_date', 'author', 'group', 'image')
+FORMATS = ('jsonl', 'csv')
+# Без этих полей пост не создать.
+REQUIRED_FIELDS = ('text', 'author')
+
+
+def guess_format(path):
+    if path.endswith('.csv'):
+        return 'csv'
+    return 'jsonl'
+
+
+def read_rows(stream, fmt):
+    """Строки архива словарями; пустые строки JSONL пропускаются.
+
+    В CSV без обязательных столбцов и в строке CSV с другим числом
+    значений, чем в заголовке, поднимается ValueError.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        missing = [name for name in REQUIRED_FIELDS
+                   if name not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f'нет столбцов: {", ".join(missing)}')
+        for row in reader:
+            if None in row or None in row.values():
+                raise ValueError(
+                    f'строка {reader.line_num}: ожидалось '
+                    f'{len(reader.fieldnames)} значений')
+            yield row
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+class RowWriter:
+    def __init__(self, stream, fmt):
+        self.stream = stream
+        self.fmt = fmt
+        if fmt == 'csv':
+            self.writer = csv.DictWriter(stream, FIELDS)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == 'csv':
+            self.writer.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+def bulk_create_dated(posts):
+    """bulk_create, сохраняющий заданные постам pub_date.
+
+    auto_now_add ставит всем вставленным постам текущее время,
+    поэтому заданные даты проставляются следом через bulk_update.
+    """
+    dates = [post.pub_date for post in posts]
+    with transaction.atomic():
+        created = Post.objects.bulk_create(posts)
+        if created and created[0].pk is None:
+            # SQLite не возвращает pk вставленных строк. Блокировка записи
+            # держится до конца транзакции, так что это последние pk.
+            pks = list(Post.objects.order_by('-pk').values_list(
+                'pk', flat=True)[:len(created)])
+            for post, pk in zip(created, reversed(pks)):
+                post.pk = pk
+        dated = []
+        for post, pub_date in zip(created, dates):
+            if pub_date is not None:
+                post.pub_date = pub_date
+                dated.append(post)
+        Post.objects.bulk_update(dated, ['pub_date'])
+
+    return created
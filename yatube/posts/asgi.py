@@ -0,0 +1,181 @@
+"""Запуск Django 2.2 под ASGI-сервером.
+
+Django 2.2 не умеет ASGI, поэтому ASGIHandler переводит scope
+в WSGI-окружение и выполняет обычную цепочку middleware в пуле
+из ASGI_WORKERS потоков через asgiref.sync_to_async. В окружении
+отмечается, что запрос пришёл по ASGI: view, помеченные
+async_variant, выполняют через async_to_sync свои асинхронные
+версии из posts.async_views на цикле сервера, а под WSGI и в тестах
+работают как обычно.
+"""
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+from tempfile import SpooledTemporaryFile
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+from . import constants
+
+ASGI_KEY = 'yatube.asgi'
+
+
+class ASGIHandler:
+    """ASGI-приложение поверх WSGI-приложения Django."""
+
+    def __init__(self, application=None):
+        self.application = application or WSGIHandler()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=constants.ASGI_WORKERS,
+                    thread_name_prefix='asgi')
+        return self._executor
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип соединения: '
+                             f'{scope["type"]}')
+        body = await read_body(receive)
+        if body is None:
+            return
+        try:
+            environ = get_environ(scope, body)
+            environ[ASGI_KEY] = True
+            await sync_to_async(self.respond, thread_sensitive=False,
+                                executor=self.get_executor())(environ, send)
+        finally:
+            body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                with self._lock:
+                    if self._executor is not None:
+                        self._executor.shutdown(wait=False)
+                        self._executor = None
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def respond(self, environ, send):
+        """Выполняет запрос в потоке пула и отправляет ответ по частям."""
+        call = async_to_sync(send)
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            # Django 2.2 отдаёт Set-Cookie с пробелом в начале значения,
+            # а ASGI-серверы такие заголовки отвергают.
+            response['headers'] = [
+                (name.lower().encode('latin-1'),
+                 value.strip().encode('latin-1'))
+                for name, value in headers]
+
+        chunks = self.application(environ, start_response)
+        try:
+            call({'type': 'http.response.start', **response})
+            for chunk in chunks:
+                if chunk:
+                    call({'type': 'http.response.body', 'body': chunk,
+                          'more_body': True})
+            call({'type': 'http.response.body', 'body': b''})
+        finally:
+            # Здесь срабатывает request_finished и закрываются
+            # соединения с БД этого потока.
+            chunks.close()
+
+
+async def read_body(receive):
+    """Тело запроса или None, если клиент отключился.
+
+    Большое тело уходит из памяти во временный файл. Закрыть
+    возвращённый файл должен вызывающий.
+    """
+    body = SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode='w+b')
+    complete = False
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        complete = True
+        return body
+    finally:
+        if not complete:
+            body.close()
+
+
+def get_environ(scope, body):
+    """WSGI-окружение запроса по ASGI scope."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # PATH_INFO в WSGI — байты UTF-8, прочитанные как latin-1.
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = (
+            scope['client'][0], str(scope['client'][1]))
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+            key = name
+        else:
+            key = f'HTTP_{name}'
+        if key in environ:
+            separator = '; ' if key == 'HTTP_COOKIE' else ','
+            value = f'{environ[key]}{separator}{value}'
+        environ[key] = value
+
+    return environ
+
+
+def async_variant(async_view):
+    """Под ASGI вместо view выполняется async_view на цикле сервера.
+
+    Декоратор ставится ближе всех к view, чтобы кеш страниц
+    и условные запросы отвечали раньше, не трогая цикл.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (ASGI_KEY not in request.META
+                    or request.method not in ('GET', 'HEAD')):
+                return view(request, *args, **kwargs)
+            return async_to_sync(async_view)(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,136 @@
+"""Асинхронные версии страниц лент и поста для ASGI.
+
+Выборки те же, что в posts.views. Независимые запросы страницы —
+страница постов автора, подписка, загрузки, комментарии — идут
+одновременно через sync_to_async в пуле из ASYNC_VIEW_WORKERS потоков,
+у каждого потока своё соединение с БД, и страница ждёт самый долгий
+из них, а не их сумму. Если ASYNC_VIEW_WORKERS равен нулю, запросы
+выполняются по очереди в текущем потоке.
+
+Пользователь запроса к этому моменту уже загружен: ключ кеша
+страниц и ETag читают request.user раньше view.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.shortcuts import get_object_or_404, render
+
+from . import constants
+from .forms import CommentForm
+from .groups import get_group_or_404
+from .models import Follow, ImageJob, Post, User
+from .perf import counting_queries
+from .thumbnails import attach_feed_thumbnails
+from .utils import get_comments_page, get_page_context, get_profile
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=constants.ASYNC_VIEW_WORKERS,
+                thread_name_prefix='async-views')
+    return _executor
+
+
+def run_lookup(call):
+    """call в потоке пула со своим соединением с БД."""
+    close_old_connections()
+    try:
+        with counting_queries():
+            return call()
+    finally:
+        close_old_connections()
+
+
+async def run(function, *args, **kwargs):
+    """Выполняет function в пуле, сохраняя контекст запроса.
+
+    sync_to_async переносит контекст, который нужен роутеру реплик
+    и замерам производительности.
+    """
+    call = partial(function, *args, **kwargs)
+    if not constants.ASYNC_VIEW_WORKERS:
+        return call()
+    return await sync_to_async(run_lookup, thread_sensitive=False,
+                               executor=get_executor())(call)
+
+
+def is_following(user, author):
+    return (user.is_authenticated
+            and Follow.objects.filter(user=user, author=author).exists())
+
+
+def get_image_jobs(user, author):
+    if user != author:
+        return ()
+    return list(author.image_jobs.exclude(status=ImageJob.DONE)
+                .order_by('-created'))
+
+
+async def index(request):
+    """Главная страница."""
+    page_obj = await run(get_page_context, Post.objects.for_feed(), request)
+    context = {
+        'page_obj': page_obj,
+    }
+
+    return await run(render, request, 'posts/index.html', context)
+
+
+async def group_posts(request, slug):
+    """Посты группы: группа берётся из справочника групп."""
+    group = await run(get_group_or_404, slug)
+    page_obj = await run(get_page_context, group.posts.for_feed(), request)
+    context = {
+        'group': group,
+        'page_obj': page_obj,
+    }
+
+    return await run(render, request, 'posts/group_list.html', context)
+
+
+async def profile(request, username):
+    """Профиль: после автора его посты, подписка и загрузки одновременно."""
+    author = await run(get_object_or_404,
+                       User.objects.select_related('profile'),
+                       username=username)
+    page_obj, following, image_jobs = await asyncio.gather(
+        run(get_page_context, author.posts.for_feed(), request),
+        run(is_following, request.user, author),
+        run(get_image_jobs, request.user, author),
+    )
+    context = {
+        'author': author,
+        'page_obj': page_obj,
+        'following': following,
+        'image_jobs': image_jobs,
+    }
+
+    return await run(render, request, 'posts/profile.html', context)
+
+
+async def post_detail(request, post_id):
+    """Пост: сам пост со счётчиками автора и комментарии одновременно."""
+    post_object, comments = await asyncio.gather(
+        run(get_object_or_404, Post.objects.for_detail(), id=post_id),
+        run(get_comments_page, Post(pk=post_id),
+            request.GET.get('comments')),
+    )
+    await run(attach_feed_thumbnails, [post_object])
+    context = {
+        'post': post_object,
+        'comments': comments,
+        'form': CommentForm(),
+        'count': get_profile(post_object.author).posts_count,
+    }
+
+    return await run(render, request, 'posts/post_detail.html', context)
@@ -0,0 +1,482 @@
+"""Нагрузочные замеры страниц постов.
+
+Модуль заполняет базу данными нужного объёма, прогоняет запросы
+к страницам и JSON API через тестовый клиент, локальный WSGI- или
+ASGI-сервер и собирает задержки, число запросов к БД, размер ответа
+и пиковую память. Результаты сохраняются в JSON и сравниваются
+с прошлым прогоном; замеры API — ещё и с такими же HTML-страницами.
+Пропускная способность страниц под WSGI и ASGI сравнивается
+при множестве одновременных клиентов.
+"""
+import json
+import platform
+import re
+import socket
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count, cycle, islice
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import django
+import requests
+import uvicorn
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+from mixer.backend.django import mixer
+
+from . import constants
+from .archive import bulk_create_dated
+from .asgi import ASGIHandler
+from .counters import reconcile_counters
+from .models import Comment, Group, Post, Profile
+from .search import get_search_backend
+
+User = get_user_model()
+
+SEED_BATCH_SIZE = 5000
+QUERIES_HEADER = 'X-Benchmark-Queries'
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+# Свой кеш замеров: холодные прогоны очищают его перед каждым запросом.
+BENCHMARK_CACHE = {
+    'BACKEND': 'posts.perf.LocMemCache',
+    'LOCATION': 'yatube-benchmark',
+}
+# Ответ замеряемых запросов, если он не 200.
+EXPECTED_STATUS = {'add_comment': 302, 'api_add_comment': 201}
+# Страницы, пропускная способность которых сравнивается под WSGI и ASGI.
+THROUGHPUT_VIEWS = ('index', 'group_posts', 'profile', 'post_detail')
+
+
+def isolated():
+    """Настройки замеров: без панели отладки, лимитов и общего кеша.
+
+    Панель отладки тратит время и запросы на каждую страницу, лимиты
+    записей отвечали бы на повторные POST кодом 429, а очистка общего
+    кеша сбросила бы страницы и лимиты других процессов.
+    """
+    return override_settings(
+        MIDDLEWARE=[name for name in settings.MIDDLEWARE
+                    if not name.startswith('debug_toolbar.')],
+        CACHES={'default': BENCHMARK_CACHE},
+        POSTS_RATE_LIMITS={scope: {} for scope in constants.RATE_LIMITS},
+    )
+
+
+def seed(posts, authors=100, groups=10, comments=200):
+    """Заполняет базу: posts постов, authors авторов, groups групп.
+
+    comments комментариев получает самый свежий пост.
+    """
+    fake = Faker('ru_RU')
+    texts = [fake.paragraph(nb_sentences=5) for _ in range(1000)]
+    users = mixer.cycle(authors).blend(
+        User, username=mixer.sequence('benchmark_{0}'))
+    group_list = mixer.cycle(groups).blend(
+        Group, slug=mixer.sequence('benchmark-{0}'))
+    now = timezone.now()
+    rows = (
+        Post(author=users[i % authors],
+             group=group_list[i % groups] if i % 3 else None,
+             text=text,
+             pub_date=now - timezone.timedelta(seconds=posts - i))
+        for i, text in enumerate(islice(cycle(texts), posts))
+    )
+    while True:
+        batch = list(islice(rows, SEED_BATCH_SIZE))
+        if not batch:
+            break
+        bulk_create_dated(batch)
+    latest = Post.objects.first()
+    Comment.objects.bulk_create([
+        Comment(post=latest, author=users[i % authors], text=text)
+        for i, text in enumerate(islice(cycle(texts), comments))
+    ])
+    reconcile_counters(User, Post, Comment, Profile)
+    get_search_backend().rebuild(Post.objects.all())
+
+    return users[0], group_list[0], latest
+
+
+def existing():
+    """Автор, группа и пост из уже заполненной базы."""
+    author = User.objects.filter(username__startswith='benchmark_').first()
+    group = Group.objects.filter(slug__startswith='benchmark-').first()
+
+    return author, group, Post.objects.first()
+
+
+def scenarios(author, group, post):
+    """Запросы, которые замеряются: имя, метод, адрес, данные."""
+    return (
+        ('index', 'get', reverse('posts:index'), None),
+        ('index_deep', 'get', reverse('posts:index') + '?page=50', None),
+        ('group_posts', 'get',
+         reverse('posts:group_list', kwargs={'slug': group.slug}), None),
+        ('profile', 'get',
+         reverse('posts:profile', kwargs={'username': author.username}),
+         None),
+        ('post_detail', 'get',
+         reverse('posts:post_detail', kwargs={'post_id': post.pk}), None),
+        ('add_comment', 'post',
+         reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+         {'text': 'benchmark comment'}),
+        ('api_index', 'get', reverse('posts:api_posts'), None),
+        ('api_index_sparse', 'get',
+         reverse('posts:api_posts') + '?fields=id,author,pub_date', None),
+        ('api_group_posts', 'get',
+         reverse('posts:api_posts') + f'?group={group.slug}', None),
+        ('api_profile', 'get',
+         reverse('posts:api_posts') + f'?author={author.username}', None),
+        ('api_post_detail', 'get',
+         reverse('posts:api_post', kwargs={'post_id': post.pk}), None),
+        ('api_add_comment', 'post',
+         reverse('posts:api_comments', kwargs={'post_id': post.pk}),
+         {'text': 'benchmark comment'}),
+    )
+
+
+# Какой HTML-странице соответствует замер API.
+API_COUNTERPARTS = {
+    'api_index': 'index',
+    'api_index_sparse': 'index',
+    'api_group_posts': 'group_posts',
+    'api_profile': 'profile',
+    'api_post_detail': 'post_detail',
+    'api_add_comment': 'add_comment',
+}
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+
+    return ordered[index]
+
+
+class ClientDriver:
+    """Запросы через тестовый клиент Django в текущем процессе."""
+
+    name = 'client'
+
+    def __init__(self, user):
+        self.client = Client()
+        self.client.force_login(user)
+
+    def request(self, method, url, data):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data)
+        return response.status_code, len(context), len(response.content)
+
+    def close(self):
+        pass
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    """WSGI-сервер с потоком на соединение, как у runserver."""
+
+    daemon_threads = True
+
+
+def login_session(user, base_url):
+    """Сессия requests с cookie вошедшего пользователя и csrftoken."""
+    client = Client()
+    client.force_login(user)
+    session = requests.Session()
+    session.cookies.update(
+        {key: morsel.value for key, morsel in client.cookies.items()})
+    # Форма создания поста выставляет cookie csrftoken,
+    # без которой сервер отклонит POST-запросы.
+    session.get(base_url + reverse('posts:post_create'))
+
+    return session
+
+
+class HTTPDriver:
+    """Запросы по HTTP к локальному серверу; base_url задают наследники."""
+
+    def __init__(self, user):
+        self.user = user
+        self.session = login_session(user, self.base_url)
+
+    def new_session(self):
+        return login_session(self.user, self.base_url)
+
+    def queries(self, response):
+        return int(response.headers.get(QUERIES_HEADER, 0))
+
+    def request(self, method, url, data, session=None):
+        session = session or self.session
+        if method == 'post':
+            data = dict(data, csrfmiddlewaretoken=session.cookies.get(
+                settings.CSRF_COOKIE_NAME, ''))
+        response = session.request(method, self.base_url + url,
+                                   data=data, allow_redirects=False)
+        return (response.status_code, self.queries(response),
+                len(response.content))
+
+
+class WSGIDriver(HTTPDriver):
+    """Запросы по HTTP к локальному WSGI-серверу в отдельном потоке."""
+
+    name = 'wsgi'
+
+    def __init__(self, user):
+        application = get_wsgi_application()
+
+        def counting_application(environ, start_response):
+            # Сервер многопоточный, поэтому ответ запоминается
+            # отдельно для каждого запроса.
+            captured = {}
+
+            def capture(status, headers, exc_info=None):
+                captured['status'] = status
+                captured['headers'] = list(headers)
+
+            with CaptureQueriesContext(connection) as context:
+                response = application(environ, capture)
+                try:
+                    body = b''.join(response)
+                finally:
+                    response.close()
+            headers = captured['headers'] + [
+                (QUERIES_HEADER, str(len(context)))]
+            start_response(captured['status'], headers)
+            return [body]
+
+        self.server = make_server('127.0.0.1', 0, counting_application,
+                                  server_class=ThreadingWSGIServer,
+                                  handler_class=QuietHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+        super().__init__(user)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class ThreadedUvicornServer(uvicorn.Server):
+    def install_signal_handlers(self):
+        # Сигналы можно перехватывать только в главном потоке.
+        pass
+
+
+class ASGIDriver(HTTPDriver):
+    """Запросы по HTTP к локальному серверу uvicorn в отдельном потоке.
+
+    Запросы к БД под ASGI идут из нескольких потоков, поэтому
+    считаются замерами производительности и читаются из Server-Timing.
+    """
+
+    name = 'asgi'
+
+    def __init__(self, user):
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        self.sample_rate = constants.PERF_SAMPLE_RATE
+        constants.PERF_SAMPLE_RATE = 1
+        self.server = ThreadedUvicornServer(uvicorn.Config(
+            ASGIHandler(), host='127.0.0.1', port=port,
+            log_level='warning', lifespan='off'))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        self.base_url = f'http://127.0.0.1:{port}'
+        super().__init__(user)
+
+    def queries(self, response):
+        match = SERVER_TIMING_QUERIES.search(
+            response.headers.get('Server-Timing', ''))
+        return int(match.group(1)) if match else 0
+
+    def close(self):
+        self.server.should_exit = True
+        self.thread.join()
+        constants.PERF_SAMPLE_RATE = self.sample_rate
+
+
+DRIVERS = {driver.name: driver
+           for driver in (ClientDriver, WSGIDriver, ASGIDriver)}
+
+
+def checked_request(driver, method, url, data, expected):
+    """Запрос через driver; ответ с другим статусом — ошибка замера."""
+    status, queries, size = driver.request(method, url, data)
+    if status != expected:
+        raise RuntimeError(f'{url}: ответ {status} вместо {expected}')
+    return status, queries, size
+
+
+def measure(driver, method, url, data, repeat, warm=False, expected=200):
+    """Замеры одного запроса: перцентили задержки, запросы, память."""
+    durations = []
+    queries = status = size = None
+    for _ in range(repeat):
+        if not warm:
+            cache.clear()
+        started = time.perf_counter()
+        status, queries, size = checked_request(
+            driver, method, url, data, expected)
+        durations.append(time.perf_counter() - started)
+    if not warm:
+        cache.clear()
+    tracemalloc.start()
+    try:
+        checked_request(driver, method, url, data, expected)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': status,
+        'p50_ms': round(percentile(durations, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(durations, 0.99) * 1000, 3),
+        'mean_ms': round(sum(durations) / len(durations) * 1000, 3),
+        'queries': queries,
+        'bytes': size,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def run(driver, cases, repeat, warm=False):
+    return {name: measure(driver, method, url, data, repeat, warm,
+                          EXPECTED_STATUS.get(name, 200))
+            for name, method, url, data in cases}
+
+
+def throughput(driver, url, concurrency, requests_count, warm=False):
+    """Запросов в секунду к url от concurrency клиентов одновременно.
+
+    Без warm у каждого запроса свой адрес, и кеш страниц не помогает.
+    """
+    sessions = [driver.new_session() for _ in range(concurrency)]
+    numbers = count()
+    separator = '&' if '?' in url else '?'
+
+    def client(session):
+        while True:
+            number = next(numbers)
+            if number >= requests_count:
+                return
+            address = url if warm else f'{url}{separator}n={number}'
+            status, _, _ = driver.request('get', address, None, session)
+            if status != 200:
+                raise RuntimeError(f'{address}: ответ {status}')
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(client, session) for session in sessions]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    for session in sessions:
+        session.close()
+
+    return round(requests_count / elapsed, 1)
+
+
+def compare_servers(user, cases, concurrency, requests_count, warm=False):
+    """Пропускная способность страниц под WSGI и под ASGI."""
+    urls = {name: url for name, method, url, data in cases
+            if name in THROUGHPUT_VIEWS}
+    results = {name: {'concurrency': concurrency} for name in urls}
+    for driver_class in (WSGIDriver, ASGIDriver):
+        driver = driver_class(user)
+        try:
+            for name, url in urls.items():
+                results[name][f'{driver.name}_rps'] = throughput(
+                    driver, url, concurrency, requests_count, warm)
+        finally:
+            driver.close()
+
+    return results
+
+
+def report(results, posts, driver, repeat, warm, servers):
+    return {
+        'meta': {
+            'created': timezone.now().isoformat(),
+            'posts': posts,
+            'driver': driver,
+            'repeat': repeat,
+            'warm_cache': warm,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+        },
+        'views': results,
+        'servers': servers,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Строки сравнения с прошлым прогоном и список регрессий."""
+    lines, regressions = [], []
+    for name, stats in current['views'].items():
+        old = baseline['views'].get(name)
+        if old is None:
+            continue
+        change = (stats['p50_ms'] - old['p50_ms']) / max(old['p50_ms'], 1e-6)
+        line = (f'{name}: p50 {old["p50_ms"]} -> {stats["p50_ms"]} мс '
+                f'({change:+.0%}), запросов {old["queries"]} -> '
+                f'{stats["queries"]}')
+        lines.append(line)
+        if change > threshold or (stats['queries'] or 0) > (
+                old['queries'] or 0):
+            regressions.append(name)
+
+    return lines, regressions
+
+
+def compare_api(results):
+    """Строки сравнения замеров API с соответствующими страницами."""
+    lines = []
+    for name, html_name in API_COUNTERPARTS.items():
+        api, html = results.get(name), results.get(html_name)
+        if api is None or html is None:
+            continue
+        lines.append(
+            f'{name} / {html_name}: p50 {api["p50_ms"]} / '
+            f'{html["p50_ms"]} мс, запросов {api["queries"]} / '
+            f'{html["queries"]}, ответ {api["bytes"]} / '
+            f'{html["bytes"]} байт')
+
+    return lines
+
+
+def compare_servers_lines(servers):
+    """Строки сравнения пропускной способности WSGI и ASGI."""
+    return [
+        f'{name}: WSGI {stats["wsgi_rps"]} / ASGI {stats["asgi_rps"]} '
+        f'запросов в секунду при {stats["concurrency"]} клиентах'
+        for name, stats in servers.items()
+    ]
+
+
+def save(data, path):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(data, output, ensure_ascii=False, indent=2)
+
+
+def load(path):
+    with open(path, encoding='utf-8') as source:
+        return json.load(source)
@@ -0,0 +1,239 @@
+"""Общий для всех процессов кеш в файле SQLite.
+
+LocMemCache у каждого воркера свой: с ростом числа воркеров падает
+доля попаданий, а сброс ленты в одном процессе не виден остальным.
+SQLiteCache хранит записи в одном файле (LOCATION), открытые
+соединения переиспользуются через пул, а значения сериализуются
+в JSON, без pickle: в кеше лежат только строки, числа, списки,
+словари и bytes.
+"""
+import base64
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .perf import CacheStatsMixin
+
+SCHEMA = ('CREATE TABLE IF NOT EXISTS cache_entries '
+          '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)')
+BYTES_TAG = '__bytes__'
+
+
+def encode_bytes(value):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {BYTES_TAG: base64.b64encode(value).decode()}
+    raise TypeError(
+        f'Значение типа {type(value).__name__} нельзя положить в кеш.')
+
+
+def decode_bytes(value):
+    if len(value) == 1 and BYTES_TAG in value:
+        return base64.b64decode(value[BYTES_TAG])
+    return value
+
+
+def dumps(value):
+    return json.dumps(value, default=encode_bytes, ensure_ascii=False,
+                      separators=(',', ':'))
+
+
+def loads(value):
+    return json.loads(value, object_hook=decode_bytes)
+
+
+class ConnectionPool:
+    """Пул соединений с файлом SQLite.
+
+    Держит не больше size свободных соединений; если все заняты,
+    открывает новое. После fork пул начинается заново: соединения
+    родителя в дочернем процессе не используются.
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        self.size = size
+        self._lock = threading.Lock()
+        self._pid = None
+        self._idle = None
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=5,
+                                     isolation_level=None,
+                                     check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(SCHEMA)
+        return connection
+
+    def _pool(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = queue.LifoQueue(self.size)
+                self._pid = os.getpid()
+            return self._idle
+
+    @contextmanager
+    def connection(self):
+        idle = self._pool()
+        try:
+            connection = idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect()
+        try:
+            yield connection
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            raise
+        finally:
+            try:
+                idle.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+
+    @contextmanager
+    def transaction(self):
+        """Соединение с открытой транзакцией на запись."""
+        with self.connection() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            yield connection
+            connection.execute('COMMIT')
+
+
+class BaseSQLiteCache(BaseCache):
+    """Кеш Django в файле SQLite, общий для процессов на одной машине.
+
+    OPTIONS: MAX_ENTRIES и CULL_FREQUENCY как у встроенных бэкендов,
+    POOL_SIZE — сколько свободных соединений держать в процессе.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.pool = ConnectionPool(location, int(options.get('POOL_SIZE', 8)))
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _get_rows(self, connection, keys):
+        placeholders = ', '.join('?' * len(keys))
+        rows = connection.execute(
+            f'SELECT key, value FROM cache_entries '
+            f'WHERE key IN ({placeholders}) '
+            f'AND (expires IS NULL OR expires > ?)', [*keys, time.time()])
+        return dict(rows)
+
+    def _cull(self, connection):
+        count, = connection.execute(
+            'SELECT COUNT(*) FROM cache_entries').fetchone()
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            # Как во встроенных бэкендах: 0 — очистить кеш целиком.
+            connection.execute('DELETE FROM cache_entries')
+            return
+        connection.execute(
+            'DELETE FROM cache_entries WHERE expires <= ?', (time.time(),))
+        count, = connection.execute(
+            'SELECT COUNT(*) FROM cache_entries').fetchone()
+        if count > self._max_entries:
+            # Записи с меньшим rowid записаны раньше остальных.
+            connection.execute(
+                'DELETE FROM cache_entries WHERE rowid IN '
+                '(SELECT rowid FROM cache_entries ORDER BY rowid LIMIT ?)',
+                (count // self._cull_frequency,))
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        with self.pool.connection() as connection:
+            value = self._get_rows(connection, [key]).get(key)
+        return default if value is None else loads(value)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        with self.pool.connection() as connection:
+            rows = self._get_rows(connection, list(keys))
+        return {keys[key]: loads(value) for key, value in rows.items()}
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        with self.pool.connection() as connection:
+            return key in self._get_rows(connection, [key])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [(self._key(key, version), dumps(value), expires)
+                for key, value in data.items()]
+        with self.pool.transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache_entries (key, value, expires) '
+                'VALUES (?, ?, ?)', rows)
+            self._cull(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self.pool.transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache_entries WHERE key = ? AND expires <= ?',
+                (key, time.time()))
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache_entries (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (key, dumps(value), self.get_backend_timeout(timeout)),
+            ).rowcount
+            if added:
+                self._cull(connection)
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self.pool.connection() as connection:
+            return bool(connection.execute(
+                'UPDATE cache_entries SET expires = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), key, time.time()),
+            ).rowcount)
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно для всех процессов, в отличие от BaseCache.incr."""
+        key = self._key(key, version)
+        with self.pool.transaction() as connection:
+            value = self._get_rows(connection, [key]).get(key)
+            if value is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = loads(value) + delta
+            connection.execute(
+                'UPDATE cache_entries SET value = ? WHERE key = ?',
+                (dumps(value), key))
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [(self._key(key, version),) for key in keys]
+        with self.pool.connection() as connection:
+            connection.executemany(
+                'DELETE FROM cache_entries WHERE key = ?', keys)
+
+    def clear(self):
+        with self.pool.connection() as connection:
+            connection.execute('DELETE FROM cache_entries')
+
+
+class SQLiteCache(CacheStatsMixin, BaseSQLiteCache):
+    pass
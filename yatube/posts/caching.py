@@ -0,0 +1,353 @@
+import contextvars
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import Count, Max
+from django.http import Http404, HttpResponse
+from django.views.decorators.http import condition
+
+from . import constants
+from .asgi import ASGI_KEY
+from .groups import get_group_or_404
+from .models import Post
+from .routers import primary_reads
+
+User = get_user_model()
+
+FEED_VERSION_KEY = 'posts:feed_version'
+FEED_MODIFIED_KEY = 'posts:feed_modified'
+USER_VERSION_KEY = 'posts:user_version'
+POST_FRAGMENT_NAME = 'post_card'
+THUMBNAIL_PAGES_KEY = 'posts:thumbnail_pages'
+PAGE_STATE_KEY = 'posts:page_state'
+
+_pending_thumbnails = contextvars.ContextVar('pending_thumbnails',
+                                             default=None)
+
+
+def get_feed_version():
+    """Текущая версия лент; меняется при любом изменении постов."""
+    version = cache.get(FEED_VERSION_KEY)
+    if version is None:
+        # Начальное значение от времени, чтобы после вытеснения ключа
+        # не вернуться к номеру, под которым ещё лежат старые страницы.
+        cache.add(FEED_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(FEED_VERSION_KEY)
+
+    return version
+
+
+def modified_key(scope=None):
+    if scope is None:
+        return FEED_MODIFIED_KEY
+    return f'{FEED_MODIFIED_KEY}:{scope}'
+
+
+def bump_feed_version(*scopes):
+    """Делает недействительными все закэшированные страницы лент.
+
+    scopes — страницы, которых касается изменение: 'index',
+    'group:<id>', 'author:<id>', 'post:<id>'; по ним считается
+    Last-Modified. Без scopes изменение касается всех страниц.
+    """
+    try:
+        cache.incr(FEED_VERSION_KEY)
+    except ValueError:
+        cache.set(FEED_VERSION_KEY, time.time_ns(), None)
+    now = time.time()
+    cache.set_many({modified_key(scope): now for scope in scopes or [None]},
+                   None)
+
+
+def get_modified(*scopes):
+    """Время последнего изменения страниц scopes или всего сайта.
+
+    Вытесненный из кэша ключ заводится заново текущим временем:
+    когда было последнее изменение, уже неизвестно.
+    """
+    keys = [modified_key(scope) for scope in (None, *scopes)]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time(), None)
+            found[key] = cache.get(key, time.time())
+
+    return max(found.values())
+
+
+def get_user_version(user_id):
+    """Версия страниц, закэшированных для пользователя user_id."""
+    key = f'{USER_VERSION_KEY}:{user_id}'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+
+    return version
+
+
+def bump_user_version(user_id):
+    """Делает недействительными страницы, закэшированные для user_id.
+
+    Нужно для того, что видит только сам пользователь, например
+    загрузки картинок в профиле.
+    """
+    key = f'{USER_VERSION_KEY}:{user_id}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def forget_post_fragments(*post_ids):
+    """Удаляет закэшированные фрагменты posts/post.html."""
+    cache.delete_many([
+        make_template_fragment_key(POST_FRAGMENT_NAME, [post_id])
+        for post_id in post_ids
+    ])
+
+
+def note_pending_thumbnail(name):
+    """Отмечает, что страница выводится без миниатюры картинки name."""
+    pending = _pending_thumbnails.get()
+    if pending is not None:
+        pending.add(name)
+
+
+def thumbnail_pages_key(name):
+    return f'{THUMBNAIL_PAGES_KEY}:{hashlib.md5(name.encode()).hexdigest()}'
+
+
+def remember_thumbnail_pages(key, names):
+    """Запоминает страницу key за картинками, ждущими миниатюры."""
+    for name in names:
+        pages_key = thumbnail_pages_key(name)
+        pages = cache.get(pages_key, [])
+        if key in pages:
+            continue
+        cache.set(pages_key, [*pages, key],
+                  constants.CASH_TIME_FOR_INDEX_PAGE_IN_SECONDS)
+
+
+def forget_thumbnail_pages(name):
+    """Удаляет страницы, закэшированные без миниатюры картинки name."""
+    pages_key = thumbnail_pages_key(name)
+    cache.delete_many([*cache.get(pages_key, []), pages_key])
+
+
+def page_address(request):
+    """Сервер и адрес страницы.
+
+    Под ASGI страница подписывается на поток событий, а под WSGI нет.
+    """
+    server = 'asgi' if ASGI_KEY in request.META else 'wsgi'
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+
+    return f'{server}:{path}'
+
+
+def feed_page_key(request):
+    """Ключ страницы: версия лент, состояние авторизации, сервер и адрес."""
+    if request.user.is_authenticated:
+        user_state = (f'user.{request.user.pk}.'
+                      f'{get_user_version(request.user.pk)}')
+    else:
+        user_state = 'anonymous'
+
+    return (f'posts:page:{get_feed_version()}:{user_state}:'
+            f'{page_address(request)}')
+
+
+def render_noting_thumbnails(view, request, *args, **kwargs):
+    """Ответ view и картинки, выведенные без готовых миниатюр."""
+    token = _pending_thumbnails.set(set())
+    try:
+        response = view(request, *args, **kwargs)
+        return response, _pending_thumbnails.get()
+    finally:
+        _pending_thumbnails.reset(token)
+
+
+def cache_feed_page(view):
+    """Кэширует ответ страницы ленты до изменения постов или TTL.
+
+    Страница для кэша читается из основной базы, а не с реплики.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+        key = feed_page_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type, pending = cached
+            response = HttpResponse(content, content_type=content_type)
+            response.pending_thumbnails = pending
+            return response
+        with primary_reads():
+            response, pending = render_noting_thumbnails(
+                view, request, *args, **kwargs)
+        response.pending_thumbnails = bool(pending)
+        if response.status_code == 200 and not response.streaming:
+            cache.set(key, (response.content, response['Content-Type'],
+                            bool(pending)),
+                      constants.CASH_TIME_FOR_INDEX_PAGE_IN_SECONDS)
+            # Готовая миниатюра удалит эту страницу, не трогая остальные.
+            remember_thumbnail_pages(key, pending)
+        return response
+
+    return wrapper
+
+
+def last_modified(*scopes):
+    """Время изменения страниц scopes для Last-Modified или None.
+
+    Last-Modified точен до секунды, поэтому в течение секунды
+    после изменения его не отдаём: иначе следующее изменение
+    в ту же секунду ответили бы по If-Modified-Since как 304.
+    """
+    modified = get_modified(*scopes)
+    if time.time() - modified < 1:
+        return None
+
+    return datetime.fromtimestamp(modified, timezone.utc)
+
+
+def read_feed_page_state(slug, username):
+    if username is not None:
+        author = (User.objects.filter(username=username)
+                  .annotate(latest=Max('posts__pub_date'),
+                            count=Count('posts'))
+                  .values_list('pk', 'latest', 'count').first())
+        if author is None:
+            raise Http404('Автор не найден.')
+        return f'author:{author[0]}', str(author[1:])
+    posts, scope = Post.objects.all(), 'index'
+    if slug is not None:
+        group = get_group_or_404(slug)
+        posts, scope = posts.filter(group_id=group.pk), f'group:{group.pk}'
+    data = posts.aggregate(latest=Max('pub_date'), count=Count('pk'))
+
+    return scope, str(tuple(data.values()))
+
+
+def feed_page_state(request, slug=None, username=None):
+    """Области страницы ленты и данные её постов.
+
+    Данные — время последнего поста и число постов. Любое изменение
+    постов меняет версию лент, поэтому до него данные берутся
+    из кэша, а не из базы. В запросе запоминаются: их читают
+    и ETag, и Last-Modified.
+    """
+    if hasattr(request, '_page_state'):
+        return request._page_state
+    page = hashlib.md5(f'{slug}:{username}'.encode()).hexdigest()
+    key = f'{PAGE_STATE_KEY}:{get_feed_version()}:{page}'
+    state = cache.get(key)
+    if state is None:
+        with primary_reads():
+            state = read_feed_page_state(slug, username)
+        cache.set(key, state, constants.CASH_TIME_FOR_INDEX_PAGE_IN_SECONDS)
+    scope, data = state
+    request._page_state = ((scope,), data)
+
+    return request._page_state
+
+
+def feed_etag(request, *args, **kwargs):
+    """ETag страницы ленты: ключ её кэша и данные её постов."""
+    data = feed_page_state(request, **kwargs)[1]
+
+    return hashlib.md5(f'{feed_page_key(request)}:{data}'.encode()).hexdigest()
+
+
+def feed_last_modified(request, *args, **kwargs):
+    """Время изменения страницы ленты или None.
+
+    Вошедшим пользователям его не отдаём: их страницы зависят
+    и от версии пользователя.
+    """
+    if request.user.is_authenticated:
+        return None
+
+    return last_modified(*feed_page_state(request, **kwargs)[0])
+
+
+def post_page_state(request, post_id):
+    """Области страницы поста и данные, которые на ней выводятся."""
+    if hasattr(request, '_page_state'):
+        return request._page_state
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'comments_count', 'author__profile__posts_count'
+    ).first()
+    if post is None:
+        raise Http404('Пост не найден.')
+    request._page_state = ((f'post:{post_id}', f'author:{post[0]}'), post)
+
+    return request._page_state
+
+
+def post_etag(request, post_id):
+    """ETag страницы поста для анонимов: её изменения и данные.
+
+    Вошедшим пользователям валидаторы не отдаются: на странице
+    форма с токеном CSRF, который меняется при входе и выходе.
+    """
+    if request.user.is_authenticated:
+        return None
+    scopes, data = post_page_state(request, post_id)
+    state = f'{get_modified(*scopes)}:{data}:{page_address(request)}'
+
+    return hashlib.md5(state.encode()).hexdigest()
+
+
+def post_last_modified(request, post_id):
+    """Время изменения страницы поста для анонимов или None."""
+    if request.user.is_authenticated:
+        return None
+
+    return last_modified(*post_page_state(request, post_id)[0])
+
+
+def conditional_page(etag_func, last_modified_func):
+    """condition, который не оставляет валидаторы у страниц без миниатюр.
+
+    Готовая миниатюра не меняет ни данных, ни времени изменения
+    страницы, и клиент с такими валидаторами так и получал бы 304
+    на страницу с заглушкой.
+    """
+    def decorator(view):
+        @wraps(view)
+        def noting_thumbnails(request, *args, **kwargs):
+            response, pending = render_noting_thumbnails(
+                view, request, *args, **kwargs)
+            if pending:
+                response.pending_thumbnails = True
+            return response
+
+        conditional = condition(etag_func=etag_func,
+                                last_modified_func=last_modified_func)(
+            noting_thumbnails)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if getattr(response, 'pending_thumbnails', False):
+                del response['ETag']
+                del response['Last-Modified']
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+# Отвечают 304 Not Modified без выполнения view и рендера шаблонов.
+conditional_feed_page = conditional_page(feed_etag, feed_last_modified)
+conditional_post_page = conditional_page(post_etag, post_last_modified)
@@ -2,3 +2,33 @@ POSTS_PER_PAGE = 10
 POSTS_PER_SECOND_PAGE = 3
 SYMBOLS_IN_SELF_TEXT = 30
 CASH_TIME_FOR_INDEX_PAGE_IN_SECONDS = 60 / 3
+POST_CARD_CACHE_SECONDS = 60 * 60
+PAGINATOR_COUNT_LIMIT = 1000
+FEED_THUMBNAIL_GEOMETRY = '960x339'
+FEED_THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+THUMBNAIL_WORKERS = 2
+COMMENTS_PER_PAGE = 20
+SEARCH_RESULTS_LIMIT = 1000
+FANOUT_FOLLOWERS_LIMIT = 1000
+FANOUT_BATCH_SIZE = 1000
+FANOUT_BACKFILL_POSTS = 100
+PERF_SAMPLE_RATE = 0.1
+IMAGE_WORKERS = 2
+IMAGE_MAX_SIZE = (2560, 2560)
+IMAGE_QUALITY = 85
+REPLICA_PIN_SECONDS = 5
+SYNDICATION_ENTRIES = 20
+SYNDICATION_TITLE_LENGTH = 80
+SYNDICATION_CACHE_SECONDS = 60 * 60 * 24
+EVENTS_HISTORY = 1000
+EVENTS_HEARTBEAT_SECONDS = 15
+EVENTS_STREAM_SECONDS = 60 * 5
+EVENTS_RETRY_MS = 3000
+ASGI_WORKERS = 32
+ASYNC_VIEW_WORKERS = 8
+# Бюджеты записей: (запросов, за сколько секунд корзина наполняется).
+RATE_LIMITS = {
+    'add_comment': {'user': (20, 60), 'ip': (60, 60)},
+    'post_create': {'user': (10, 60), 'ip': (30, 60)},
+    'signup': {'ip': (10, 60 * 10)},
+}
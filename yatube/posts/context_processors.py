@@ -0,0 +1,16 @@
+from . import constants
+from .asgi import ASGI_KEY
+
+
+def live_events(request):
+    """Добавляет в контекст флаг live_events: страница отдана под ASGI.
+
+    Под WSGI поток событий держал бы поток сервера на каждую открытую
+    страницу, поэтому страницы подписываются на него только под ASGI.
+    """
+    return {'live_events': ASGI_KEY in request.META}
+
+
+def post_card_cache(request):
+    """Добавляет в контекст время жизни кеша карточки поста."""
+    return {'post_card_cache_seconds': constants.POST_CARD_CACHE_SECONDS}
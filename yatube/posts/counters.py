@@ -0,0 +1,55 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model, field, outer='pk'):
+    """Подзапрос с числом строк model, ссылающихся на внешнюю запись."""
+    rows = (model.objects.filter(**{field: OuterRef(outer)})
+            .order_by().values(field).annotate(total=Count('pk'))
+            .values('total'))
+
+    return Coalesce(Subquery(rows), 0)
+
+
+def reconcile_counters(User, Post, Comment, Profile):
+    """Пересчитывает денормализованные счётчики.
+
+    Модели передаются явно, чтобы функцию можно было вызвать
+    и из миграции. Возвращает число исправленных профилей и постов.
+    """
+    Profile.objects.bulk_create([
+        Profile(user_id=pk)
+        for pk in User.objects.filter(profile__isnull=True)
+        .values_list('pk', flat=True)
+    ])
+    posts_total = count_subquery(Post, 'author', outer='user_id')
+    profiles_fixed = (Profile.objects.annotate(actual=posts_total)
+                      .exclude(posts_count=F('actual')).count())
+    Profile.objects.update(posts_count=posts_total)
+
+    comments_total = count_subquery(Comment, 'post')
+    posts_fixed = (Post.objects.annotate(actual=comments_total)
+                   .exclude(comments_count=F('actual')).count())
+    Post.objects.update(comments_count=comments_total)
+
+    return profiles_fixed, posts_fixed
+
+
+def reconcile_media_references(Post, MediaFile):
+    """Пересчитывает ссылки постов на файлы картинок.
+
+    Заводит записи MediaFile для картинок, на которые их ещё нет.
+    Возвращает число исправленных записей.
+    """
+    MediaFile.objects.bulk_create([
+        MediaFile(name=name)
+        for name in Post.objects.exclude(image='')
+        .exclude(image__in=MediaFile.objects.values('name'))
+        .order_by().values_list('image', flat=True).distinct()
+    ])
+    refs_total = count_subquery(Post, 'image', outer='name')
+    fixed = (MediaFile.objects.annotate(actual=refs_total)
+             .exclude(refs=F('actual')).count())
+    MediaFile.objects.update(refs=refs_total)
+
+    return fixed
@@ -0,0 +1,241 @@
+"""Поток событий о новых постах и комментариях (server-sent events).
+
+Сигналы после фиксации транзакции публикуют события в брокер,
+а открытые соединения /events/ получают их в формате text/event-stream.
+LocalBroker живёт в памяти процесса и видит только события своего
+процесса; общий брокер подключается настройкой POSTS_EVENT_BROKER
+и должен предоставлять те же методы: publish, last_id, wait
+и wait_async.
+
+Django 2.2 не умеет асинхронные view, поэтому view events под WSGI
+занимает поток на соединение; чтобы потоки не копились, поток
+закрывается через EVENTS_STREAM_SECONDS, а браузер сам
+переподключается с заголовком Last-Event-ID. Под ASGI-сервером тот же
+поток отдаёт приложение asgi_events: ждущее соединение там стоит
+одну корутину, а не поток.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import QueryDict, StreamingHttpResponse
+from django.utils.module_loading import import_string
+from django.utils.text import Truncator
+from django.views.decorators.http import require_GET
+
+from . import constants
+
+
+class LocalBroker:
+    """Брокер в памяти процесса с короткой историей событий.
+
+    История нужна переподключившимся клиентам: они получают всё,
+    что пропустили, если оно ещё не вытеснено.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._events = deque(maxlen=constants.EVENTS_HISTORY)
+        self._last_id = 0
+        self._waiters = set()
+
+    def publish(self, kind, data):
+        with self._condition:
+            self._last_id += 1
+            event = {'id': self._last_id, 'type': kind, 'data': data}
+            self._events.append(event)
+            self._condition.notify_all()
+            waiters, self._waiters = self._waiters, set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+        return event
+
+    def last_id(self):
+        return self._last_id
+
+    def _since(self, last_id):
+        return [event for event in self._events if event['id'] > last_id]
+
+    def wait(self, last_id, timeout):
+        """События после last_id; ждёт новых не дольше timeout секунд."""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._last_id > last_id, timeout)
+            return self._since(last_id)
+
+    async def wait_async(self, last_id, timeout):
+        """То же, что wait, но без занятого потока."""
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if self._last_id > last_id:
+                return self._since(last_id)
+            waiter = (loop, loop.create_future())
+            self._waiters.add(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._condition:
+                self._waiters.discard(waiter)
+        with self._condition:
+            return self._since(last_id)
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+@lru_cache(maxsize=None)
+def load_broker(path):
+    return import_string(path)()
+
+
+def get_broker():
+    """Брокер из настройки POSTS_EVENT_BROKER, один на процесс."""
+    return load_broker(getattr(settings, 'POSTS_EVENT_BROKER',
+                               'posts.events.LocalBroker'))
+
+
+def post_event(post):
+    return {
+        'id': post.pk,
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'text': Truncator(post.text).chars(
+            constants.SYNDICATION_TITLE_LENGTH),
+    }
+
+
+def comment_event(comment):
+    return {
+        'id': comment.pk,
+        'post': comment.post_id,
+        'author': comment.author.username,
+        'text': Truncator(comment.text).chars(
+            constants.SYNDICATION_TITLE_LENGTH),
+    }
+
+
+def event_filter(params):
+    """Условие из параметров запроса: ?post=, ?group=, ?author=."""
+    post = params.get('post')
+    group = params.get('group')
+    author = params.get('author')
+
+    def accept(event):
+        data = event['data']
+        if post is not None:
+            return event['type'] == 'comment' and str(data['post']) == post
+        if event['type'] != 'post':
+            return False
+        if group is not None and data['group'] != group:
+            return False
+        return author is None or data['author'] == author
+
+    return accept
+
+
+def format_event(event):
+    data = json.dumps(event['data'], ensure_ascii=False)
+    return f'id: {event["id"]}\nevent: {event["type"]}\ndata: {data}\n\n'
+
+
+def start_id(broker, last_event_id):
+    """С какого события продолжать: Last-Event-ID или с текущего."""
+    try:
+        last_id = int(last_event_id)
+    except (TypeError, ValueError):
+        return broker.last_id()
+    # Номер из другого процесса или до перезапуска: начинаем заново.
+    return last_id if 0 <= last_id <= broker.last_id() else broker.last_id()
+
+
+def stream(broker, last_id, accept):
+    yield f'retry: {constants.EVENTS_RETRY_MS}\n\n'
+    deadline = time.monotonic() + constants.EVENTS_STREAM_SECONDS
+    while time.monotonic() < deadline:
+        events = broker.wait(last_id, constants.EVENTS_HEARTBEAT_SECONDS)
+        if not events:
+            yield ': ping\n\n'
+        for event in events:
+            last_id = event['id']
+            if accept(event):
+                yield format_event(event)
+
+
+def prepare_stream_response(response):
+    response['Cache-Control'] = 'no-cache'
+    # Иначе nginx копит поток в буфере и события приходят пачками.
+    response['X-Accel-Buffering'] = 'no'
+
+    return response
+
+
+@require_GET
+def events(request):
+    """Поток событий о новых постах и комментариях."""
+    broker = get_broker()
+    last_id = start_id(broker, request.META.get('HTTP_LAST_EVENT_ID'))
+    response = StreamingHttpResponse(
+        stream(broker, last_id, event_filter(request.GET)),
+        content_type='text/event-stream')
+
+    return prepare_stream_response(response)
+
+
+async def wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def asgi_events(scope, receive, send):
+    """ASGI-приложение того же потока событий."""
+    if scope['method'] not in ('GET', 'HEAD'):
+        await send({'type': 'http.response.start', 'status': 405,
+                    'headers': [(b'allow', b'GET, HEAD')]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    broker = get_broker()
+    headers = dict(scope['headers'])
+    last_id = start_id(broker, headers.get(b'last-event-id', b'').decode())
+    accept = event_filter(
+        QueryDict(scope.get('query_string', b'').decode('latin-1')))
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream; charset=utf-8'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),
+    ]})
+    if scope['method'] == 'HEAD':
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    await send({'type': 'http.response.body', 'more_body': True,
+                'body': f'retry: {constants.EVENTS_RETRY_MS}\n\n'.encode()})
+    disconnected = asyncio.ensure_future(wait_disconnect(receive))
+    try:
+        while True:
+            waiting = asyncio.ensure_future(broker.wait_async(
+                last_id, constants.EVENTS_HEARTBEAT_SECONDS))
+            await asyncio.wait((waiting, disconnected),
+                               return_when=asyncio.FIRST_COMPLETED)
+            if disconnected.done():
+                waiting.cancel()
+                return
+            events = waiting.result()
+            chunks = [format_event(event) for event in events
+                      if accept(event)]
+            if events:
+                last_id = events[-1]['id']
+            else:
+                chunks.append(': ping\n\n')
+            if chunks:
+                await send({'type': 'http.response.body', 'more_body': True,
+                            'body': ''.join(chunks).encode()})
+    finally:
+        disconnected.cancel()
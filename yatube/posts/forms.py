@@ -1,8 +1,40 @@
+from django import forms
 from django.forms import ModelForm
+from django.forms.models import ModelChoiceIterator
 
+from .groups import get_groups
 from .models import Post, Comment
 
 
+class UploadedImageField(forms.ImageField):
+    """Поле картинки, которое не декодирует файл в запросе.
+
+    Проверяются только наличие файла и расширение; содержимое
+    проверяет фоновая обработка в posts.images.
+    """
+
+    def to_python(self, data):
+        return forms.FileField.to_python(self, data)
+
+
+class GroupChoiceIterator(ModelChoiceIterator):
+    """Варианты выбора группы из справочника, без запроса к БД."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for group in get_groups():
+            yield self.choice(group)
+
+    def __len__(self):
+        return (len(get_groups())
+                + (self.field.empty_label is not None))
+
+
+class GroupChoiceField(forms.ModelChoiceField):
+    iterator = GroupChoiceIterator
+
+
 class PostForm(ModelForm):
     """Форма Post для создания формы для работы с моделью User."""
 
@@ -10,6 +42,16 @@ class PostForm(ModelForm):
 
         model = Post
         fields = ('text', 'group', 'image')
+        field_classes = {
+            'group': GroupChoiceField,
+            'image': UploadedImageField,
+        }
+
+    def new_image(self):
+        """Новый загруженный файл картинки или None."""
+        if 'image' not in self.changed_data:
+            return None
+        return self.cleaned_data['image'] or None
 
 
 class CommentForm(ModelForm):
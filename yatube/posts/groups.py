@@ -0,0 +1,93 @@
+"""Справочник групп в памяти процесса.
+
+Групп немного и меняются они редко, поэтому все они загружаются
+одним запросом и хранятся в процессе. Номер версии справочника
+лежит в общем кеше: сохранение или удаление группы меняет его,
+и каждый процесс перечитывает группы при следующем обращении.
+Наружу отдаются копии, чтобы запросы не делили между собой
+изменяемые экземпляры моделей.
+"""
+import copy
+import threading
+import time
+
+from django.core.cache import cache
+from django.http import Http404
+
+from .models import Group
+
+GROUPS_VERSION_KEY = 'posts:groups_version'
+
+
+def get_groups_version():
+    version = cache.get(GROUPS_VERSION_KEY)
+    if version is None:
+        cache.add(GROUPS_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(GROUPS_VERSION_KEY)
+
+    return version
+
+
+def forget_groups():
+    """Заставляет все процессы перечитать группы."""
+    try:
+        cache.incr(GROUPS_VERSION_KEY)
+    except ValueError:
+        cache.set(GROUPS_VERSION_KEY, time.time_ns(), None)
+
+
+class GroupDirectory:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._groups = ()
+        self._by_id = {}
+        self._by_slug = {}
+
+    def _current(self):
+        version = get_groups_version()
+        if version != self._version:
+            groups = tuple(Group.objects.order_by('pk'))
+            with self._lock:
+                self._groups = groups
+                self._by_id = {group.pk: group for group in groups}
+                self._by_slug = {group.slug: group for group in groups}
+                self._version = version
+        return self
+
+    def all(self):
+        return [copy.copy(group) for group in self._current()._groups]
+
+    def by_id(self):
+        return self._current()._by_id
+
+    def by_slug(self):
+        return self._current()._by_slug
+
+
+directory = GroupDirectory()
+
+
+def get_groups():
+    """Все группы в порядке создания."""
+    return directory.all()
+
+
+def get_group_or_404(slug):
+    group = directory.by_slug().get(slug)
+    if group is None:
+        raise Http404('Группа не найдена.')
+
+    return copy.copy(group)
+
+
+def attach_groups(posts):
+    """Проставляет постам группы из справочника вместо JOIN."""
+    posts = [post for post in posts if post.group_id is not None]
+    if not posts:
+        return
+    groups = directory.by_id()
+    for post in posts:
+        group = groups.get(post.group_id)
+        if group is not None:
+            post.group = copy.copy(group)
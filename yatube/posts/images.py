@@ -0,0 +1,128 @@
+"""Фоновая обработка загруженных картинок постов.
+
+Запрос только сохраняет исходный файл во временный каталог
+хранилища и создаёт ImageJob. Проверка, поворот по EXIF, удаление
+метаданных, уменьшение и пересжатие идут в пуле потоков.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+
+from . import constants
+from .models import ImageJob, Post
+from .thumbnails import schedule_feed_thumbnail
+
+logger = logging.getLogger(__name__)
+
+# Форматы, которые сохраняются как есть; остальные переводятся в JPEG.
+SAVE_OPTIONS = {
+    'JPEG': {'quality': constants.IMAGE_QUALITY, 'optimize': True},
+    'PNG': {'optimize': True},
+    'GIF': {},
+    'WEBP': {'quality': constants.IMAGE_QUALITY},
+}
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+
+_executor = None
+_lock = threading.Lock()
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def normalize_image(file_):
+    """Проверенная и пересжатая картинка: (имя файла, содержимое)."""
+    try:
+        with file_.open('rb'):
+            Image.open(file_).verify()
+        # После verify картинку нужно открыть заново.
+        with file_.open('rb'):
+            image = Image.open(file_)
+            image_format = image.format
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail(constants.IMAGE_MAX_SIZE)
+    except (OSError, SyntaxError, ValueError,
+            Image.DecompressionBombError) as error:
+        raise InvalidImage(f'Файл не является картинкой: {error}')
+
+    if image_format not in SAVE_OPTIONS:
+        image_format = 'JPEG'
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    # EXIF и прочие метаданные не переносятся.
+    image.info = {key: value for key, value in image.info.items()
+                  if key == 'transparency'}
+    output = BytesIO()
+    image.save(output, image_format, **SAVE_OPTIONS[image_format])
+    name = (os.path.splitext(os.path.basename(file_.name))[0]
+            + EXTENSIONS[image_format])
+
+    return name, ContentFile(output.getvalue())
+
+
+def process_image_job(job_id):
+    """Обрабатывает картинку и публикует пост или заменяет его картинку."""
+    try:
+        job = ImageJob.objects.select_related('post').get(pk=job_id)
+        job.status = ImageJob.PROCESSING
+        job.save(update_fields=('status', 'updated'))
+        try:
+            name, content = normalize_image(job.upload)
+        except InvalidImage as error:
+            job.status = ImageJob.FAILED
+            job.error = str(error)
+        else:
+            post = job.post or Post(author_id=job.author_id, text=job.text,
+                                    group_id=job.group_id)
+            post.image.save(name, content, save=False)
+            if post.pk is None:
+                post.save()
+            else:
+                post.save(update_fields=('image',))
+            job.post = post
+            job.status = ImageJob.DONE
+            schedule_feed_thumbnail(post.image.name)
+        job.upload.delete(save=False)
+        job.save()
+    except Exception:
+        logger.exception('Не удалось обработать картинку, задача %s', job_id)
+        ImageJob.objects.filter(pk=job_id).update(
+            status=ImageJob.FAILED, error='Внутренняя ошибка обработки')
+
+
+def run_image_job(job_id):
+    """process_image_job в потоке пула со своим соединением с БД."""
+    close_old_connections()
+    try:
+        process_image_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=constants.IMAGE_WORKERS,
+                thread_name_prefix='images')
+    return _executor
+
+
+def submit_image_job(job):
+    """Ставит обработку в пул потоков после фиксации транзакции.
+
+    Если IMAGE_WORKERS равен нулю, картинка обрабатывается сразу.
+    """
+    if not constants.IMAGE_WORKERS:
+        process_image_job(job.pk)
+        return
+    transaction.on_commit(lambda: get_executor().submit(
+        run_image_job, job.pk))
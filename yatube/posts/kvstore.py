@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import threading
+
+from django.conf import settings
+from sorl.thumbnail.images import deserialize_image_file
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+
+SCHEMA = ('CREATE TABLE IF NOT EXISTS thumbnail_kvstore '
+          '(key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+
+
+class SQLiteKVStore(KVStoreBase):
+    """Хранилище метаданных sorl в отдельном файле SQLite.
+
+    Файл общий для всех процессов приложения, поэтому сведения о
+    созданных миниатюрах не собираются заново в каждом воркере.
+    Путь задаётся настройкой THUMBNAIL_KVSTORE_PATH.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+
+    @property
+    def path(self):
+        return getattr(settings, 'THUMBNAIL_KVSTORE_PATH',
+                       os.path.join(settings.BASE_DIR, 'thumbnails.sqlite3'))
+
+    @property
+    def connection(self):
+        """Соединение текущего потока; открывается при первом обращении."""
+        path = self.path
+        if getattr(self._local, 'path', None) != path:
+            connection = sqlite3.connect(path, timeout=5,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(SCHEMA)
+            self._local.connection = connection
+            self._local.path = path
+        return self._local.connection
+
+    def get_many(self, image_files):
+        """Ищет несколько файлов одним запросом.
+
+        Возвращает словарь {ключ файла: ImageFile или None}.
+        """
+        keys = {add_prefix(image_file.key): image_file.key
+                for image_file in image_files}
+        found = self._get_many_raw(list(keys))
+
+        return {key: deserialize_image_file(found[raw_key])
+                if raw_key in found else None
+                for raw_key, key in keys.items()}
+
+    def _get_many_raw(self, keys):
+        if not keys:
+            return {}
+        placeholders = ', '.join('?' * len(keys))
+        rows = self.connection.execute(
+            f'SELECT key, value FROM thumbnail_kvstore '
+            f'WHERE key IN ({placeholders})', keys)
+        return dict(rows)
+
+    def _get_raw(self, key):
+        return self._get_many_raw([key]).get(key)
+
+    def _set_raw(self, key, value):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO thumbnail_kvstore (key, value) '
+            'VALUES (?, ?)', (key, value))
+
+    def _delete_raw(self, *keys):
+        self.connection.executemany(
+            'DELETE FROM thumbnail_kvstore WHERE key = ?',
+            [(key,) for key in keys])
+
+    def _find_keys_raw(self, prefix):
+        rows = self.connection.execute(
+            'SELECT key FROM thumbnail_kvstore WHERE key >= ? AND key < ?',
+            (prefix, prefix + '\uffff'))
+        return [key for key, in rows]
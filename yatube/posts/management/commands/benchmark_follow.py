@@ -0,0 +1,101 @@
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from posts import constants
+from posts.models import Follow, Post, Profile
+from posts.timeline import (
+    fan_out_follow, get_follow_posts, get_follow_posts_on_read)
+
+User = get_user_model()
+
+
+@contextmanager
+def fan_out_limit(limit):
+    saved = constants.FANOUT_FOLLOWERS_LIMIT
+    constants.FANOUT_FOLLOWERS_LIMIT = limit
+    try:
+        yield
+    finally:
+        constants.FANOUT_FOLLOWERS_LIMIT = saved
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает ленту подписок с раскладкой при записи '
+            'и при чтении. Данные создаются в транзакции и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20,
+                            help='Постов у каждого автора.')
+        parser.add_argument('--followers', type=int, default=200,
+                            help='Подписчиков у каждого автора.')
+        parser.add_argument('--writes', type=int, default=20,
+                            help='Сколько постов создать при замере записи.')
+        parser.add_argument('--repeat', type=int, default=20,
+                            help='Сколько раз читать первую страницу.')
+
+    def seed(self, options):
+        User.objects.bulk_create([
+            User(username=f'benchmark_{i}')
+            for i in range(options['authors'] + options['followers'] + 1)
+        ])
+        users = list(User.objects.filter(
+            username__startswith='benchmark_').order_by('pk'))
+        reader = users[0]
+        authors = users[1:options['authors'] + 1]
+        followers = users[options['authors'] + 1:]
+        Profile.objects.bulk_create(
+            [Profile(user=user) for user in users])
+        Profile.objects.filter(user__in=authors).update(
+            followers_count=len(followers) + 1)
+        Post.objects.bulk_create([
+            Post(author=author, text=f'benchmark post {i}')
+            for author in authors for i in range(options['posts'])
+        ])
+        Follow.objects.bulk_create(
+            [Follow(user=reader, author=author) for author in authors]
+            + [Follow(user=follower, author=author)
+               for author in authors for follower in followers])
+        for follow in Follow.objects.filter(user=reader):
+            fan_out_follow(follow)
+        return reader, authors[0]
+
+    def measure_writes(self, author, count):
+        started = time.perf_counter()
+        for i in range(count):
+            Post.objects.create(author=author, text=f'benchmark write {i}')
+        return (time.perf_counter() - started) / count * 1000
+
+    def measure_reads(self, reader, follow_posts, repeat):
+        durations = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                list(follow_posts(reader).for_feed()
+                     .order_by('-pub_date', '-pk')[:constants.POSTS_PER_PAGE])
+                durations.append(time.perf_counter() - started)
+        durations.sort()
+        return durations[len(durations) // 2] * 1000, len(context)
+
+    def handle(self, *args, **options):
+        strategies = (
+            ('запись (fan-out-on-write)', 10 ** 9, get_follow_posts),
+            ('чтение (fan-out-on-read)', -1, get_follow_posts_on_read),
+        )
+        with transaction.atomic():
+            reader, author = self.seed(options)
+            for name, limit, follow_posts in strategies:
+                with fan_out_limit(limit):
+                    write_ms = self.measure_writes(author, options['writes'])
+                    read_ms, queries = self.measure_reads(
+                        reader, follow_posts, options['repeat'])
+                self.stdout.write(
+                    f'{name}: запись поста {write_ms:.2f} мс, '
+                    f'первая страница {read_ms:.2f} мс (медиана), '
+                    f'запросов {queries}')
+            transaction.set_rollback(True)
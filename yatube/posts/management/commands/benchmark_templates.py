@@ -0,0 +1,81 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils.module_loading import import_string
+
+from posts import benchmark, constants
+from posts.models import Post
+from posts.utils import get_page_context
+
+
+def make_backend(name, config):
+    """Отдельный экземпляр движка шаблонов с настройками config."""
+    params = dict(config)
+    backend = import_string(params.pop('BACKEND'))
+    params.setdefault('DIRS', [])
+    params.setdefault('APP_DIRS', False)
+    params.setdefault('OPTIONS', {})
+
+    return backend(dict(params, NAME=name))
+
+
+class Command(BaseCommand):
+    help = ('Замеряет загрузку и рендер posts/index.html с включениями '
+            'post.html при текущих и боевых настройках шаблонов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument(
+            '--production-settings', default='yatube.settings_production',
+            help='Модуль настроек, с которыми сравнивать текущие.')
+        parser.add_argument(
+            '--warm-fragments', action='store_true',
+            help='Не очищать кеш фрагментов post.html между рендерами.')
+
+    def measure(self, backend, context, request, repeat, warm):
+        loads, renders = [], []
+        for _ in range(repeat):
+            if not warm:
+                cache.clear()
+            started = time.perf_counter()
+            template = backend.get_template('posts/index.html')
+            loaded = time.perf_counter()
+            template.render(context, request)
+            rendered = time.perf_counter()
+            loads.append(loaded - started)
+            renders.append(rendered - loaded)
+
+        return (benchmark.percentile(loads, 0.5),
+                benchmark.percentile(renders, 0.5),
+                benchmark.percentile(renders, 0.99))
+
+    def handle(self, *args, **options):
+        production = import_module(options['production_settings'])
+        configs = (
+            ('текущие', settings.TEMPLATES[0]),
+            ('боевые', production.TEMPLATES[0]),
+        )
+        with transaction.atomic():
+            benchmark.seed(constants.POSTS_PER_PAGE * 2, authors=3,
+                           groups=2, comments=0)
+            request = RequestFactory().get('/')
+            request.user = AnonymousUser()
+            page_obj = get_page_context(Post.objects.for_feed(), request)
+            list(page_obj)
+            context = {'page_obj': page_obj}
+            for number, (name, config) in enumerate(configs):
+                backend = make_backend(f'benchmark_{number}', config)
+                load, p50, p99 = self.measure(
+                    backend, context, request, options['repeat'],
+                    options['warm_fragments'])
+                self.stdout.write(
+                    f'{name}: загрузка {load * 1e6:.0f} мкс, '
+                    f'рендер p50 {p50 * 1e6:.0f} мкс, '
+                    f'p99 {p99 * 1e6:.0f} мкс')
+            transaction.set_rollback(True)
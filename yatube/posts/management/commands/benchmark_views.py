@@ -0,0 +1,121 @@
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число запросов и память страниц постов '
+            'на отдельной тестовой базе с заданным числом постов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000,
+                            help='Сколько постов создать (10^3–10^6).')
+        parser.add_argument('--authors', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--repeat', type=int, default=50,
+                            help='Сколько раз запрашивать каждую страницу.')
+        parser.add_argument('--driver', choices=sorted(benchmark.DRIVERS),
+                            default='client',
+                            help='Тестовый клиент или локальный WSGI- '
+                                 'или ASGI-сервер.')
+        parser.add_argument('--warm', action='store_true',
+                            help='Не очищать кеш между запросами.')
+        parser.add_argument(
+            '--concurrency', type=int,
+            help='Сравнить пропускную способность страниц под WSGI и ASGI '
+                 'при стольких одновременных клиентах.')
+        parser.add_argument(
+            '--throughput-requests', type=int, default=1000,
+            help='Сколько запросов к странице при сравнении серверов.')
+        parser.add_argument('--database-file',
+                            help='Файл тестовой базы SQLite.')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Не пересоздавать и не удалять базу.')
+        parser.add_argument('--output', help='Сохранить результаты в JSON.')
+        parser.add_argument('--compare',
+                            help='JSON прошлого прогона для сравнения.')
+        parser.add_argument(
+            '--max-regression', type=float, default=0.2,
+            help='Допустимый рост медианы задержки, доля (0.2 — 20%%).')
+
+    def setup_database(self, options):
+        test_settings = connection.settings_dict.setdefault('TEST', {})
+        path = options['database_file']
+        # WSGI- и ASGI-серверы работают в своих потоках со своими
+        # соединениями, поэтому базе SQLite нужен файл, а не память.
+        if path is None and connection.vendor == 'sqlite':
+            path = os.path.join(tempfile.gettempdir(), 'yatube_benchmark.db')
+        if path is not None:
+            test_settings['NAME'] = path
+        keepdb = options['keepdb']
+        filled = keepdb and path is not None and os.path.exists(path)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, keepdb=keepdb, serialize=False)
+
+        return old_name, filled
+
+    def write_results(self, results):
+        for name, stats in results.items():
+            self.stdout.write(
+                f'{name}: p50 {stats["p50_ms"]} мс, p99 {stats["p99_ms"]} мс, '
+                f'запросов {stats["queries"]}, '
+                f'ответ {stats["bytes"]} байт, '
+                f'память {stats["peak_kib"]} КиБ')
+        for line in benchmark.compare_api(results):
+            self.stdout.write(line)
+
+    def compare_servers(self, author, cases, options):
+        if not options['concurrency']:
+            return {}
+        return benchmark.compare_servers(
+            author, cases, options['concurrency'],
+            options['throughput_requests'], options['warm'])
+
+    def handle(self, *args, **options):
+        with benchmark.isolated():
+            self.measure(options)
+
+    def measure(self, options):
+        baseline = None
+        if options['compare']:
+            baseline = benchmark.load(options['compare'])
+        old_name, filled = self.setup_database(options)
+        try:
+            if filled:
+                author, group, post = benchmark.existing()
+            else:
+                author, group, post = benchmark.seed(
+                    options['posts'], options['authors'], options['groups'])
+            cases = benchmark.scenarios(author, group, post)
+            driver = benchmark.DRIVERS[options['driver']](author)
+            try:
+                results = benchmark.run(
+                    driver, cases, options['repeat'], options['warm'])
+            finally:
+                driver.close()
+            servers = self.compare_servers(author, cases, options)
+            posts = benchmark.Post.objects.count()
+        finally:
+            connection.creation.destroy_test_db(
+                old_name, verbosity=0, keepdb=options['keepdb'])
+
+        data = benchmark.report(results, posts, options['driver'],
+                                options['repeat'], options['warm'], servers)
+        self.write_results(results)
+        for line in benchmark.compare_servers_lines(servers):
+            self.stdout.write(line)
+        if options['output']:
+            benchmark.save(data, options['output'])
+        if baseline is not None:
+            lines, regressions = benchmark.compare(
+                data, baseline, options['max_regression'])
+            for line in lines:
+                self.stdout.write(line)
+            if regressions:
+                raise CommandError(
+                    'Регрессии: ' + ', '.join(regressions))
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.counters import reconcile_media_references
+from posts.media import delete_file, find_garbage
+from posts.models import MediaFile, Post
+
+
+class Command(BaseCommand):
+    help = ('Удаляет картинки, на которые не ссылается ни один пост, '
+            'вместе с их миниатюрами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=int, default=24,
+            help='Не трогать файлы моложе этого возраста: они могут '
+                 'принадлежать постам, которые ещё сохраняются.')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено.')
+
+    def handle(self, *args, **options):
+        fixed = reconcile_media_references(Post, MediaFile)
+        older_than = timezone.now() - timedelta(hours=options['grace_hours'])
+        garbage = list(find_garbage(older_than))
+        deleted = 0
+        for name in garbage:
+            if options['dry_run']:
+                self.stdout.write(name)
+            elif delete_file(name, older_than):
+                deleted += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков ссылок: {fixed}, '
+            f'найдено сирот: {len(garbage)}, удалено: {deleted}'))
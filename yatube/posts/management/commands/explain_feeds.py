@@ -0,0 +1,73 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from posts import constants
+from posts.models import Comment, Group, Post
+from posts.paginator import KeysetPaginator
+
+# Признаки плана, при которых запрос читает всю таблицу
+# или сортирует строки во временной структуре.
+WARNING_PATTERNS = (
+    re.compile(r'\bSCAN (TABLE )?\w+$'),
+    re.compile(r'USE TEMP B-TREE'),
+    re.compile(r'\bSeq Scan\b'),
+    re.compile(r'(^|->)\s*Sort\b'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN для запросов страниц постов и отмечает '
+            'полные просмотры таблиц и сортировки во временных B-деревьях.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict', action='store_true',
+            help='Завершиться с ошибкой, если найдены проблемные планы.')
+
+    def feed_querysets(self, name, queryset, per_page, date_field):
+        paginator = KeysetPaginator(queryset, per_page,
+                                    date_field=date_field)
+        now = timezone.now()
+        yield f'{name}: первая страница', paginator.ordered_list[:per_page]
+        yield (f'{name}: следующая страница',
+               paginator.seek(now, 0)[:per_page])
+        yield (f'{name}: предыдущая страница',
+               paginator.seek(now, 0, backwards=True)[:per_page])
+
+    def querysets(self):
+        group = Group.objects.order_by('pk').first() or Group(pk=0)
+        author = (get_user_model().objects.order_by('pk').first()
+                  or get_user_model()(pk=0))
+        post = Post.objects.order_by('pk').first() or Post(pk=0)
+        feeds = (
+            ('index', Post.objects.for_feed(),
+             constants.POSTS_PER_PAGE, 'pub_date'),
+            ('group_posts', Post.objects.filter(group=group).for_feed(),
+             constants.POSTS_PER_PAGE, 'pub_date'),
+            ('profile', Post.objects.filter(author=author).for_feed(),
+             constants.POSTS_PER_PAGE, 'pub_date'),
+            ('post_detail', Comment.objects.filter(post=post).for_detail(),
+             constants.COMMENTS_PER_PAGE, 'created'),
+        )
+        for feed in feeds:
+            yield from self.feed_querysets(*feed)
+
+    def handle(self, *args, **options):
+        problems = 0
+        for name, queryset in self.querysets():
+            plan = queryset.explain()
+            flagged = [line for line in plan.splitlines()
+                       if any(pattern.search(line)
+                              for pattern in WARNING_PATTERNS)]
+            style = self.style.WARNING if flagged else self.style.SUCCESS
+            self.stdout.write(style(name))
+            for line in plan.splitlines():
+                marker = '!' if line in flagged else ' '
+                self.stdout.write(f' {marker} {line}')
+            problems += bool(flagged)
+        if problems and options['strict']:
+            raise CommandError(f'Проблемных планов: {problems}')
+        self.stdout.write(f'Проблемных планов: {problems}')
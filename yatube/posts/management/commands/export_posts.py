@@ -0,0 +1,46 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.archive import FIELDS, FORMATS, RowWriter, guess_format
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты в JSONL или CSV. Посты читаются '
+            'из базы порциями, картинки записываются путями в хранилище.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл архива или - для stdout.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help='Сколько постов читать из базы за раз.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        rows = (Post.objects.order_by('pk')
+                .values_list('text', 'pub_date', 'author__username',
+                             'group__slug', 'image')
+                .iterator(chunk_size=options['batch_size']))
+        stream = (sys.stdout if path == '-'
+                  else open(path, 'w', encoding='utf-8', newline=''))
+        started = time.perf_counter()
+        total = 0
+        try:
+            writer = RowWriter(stream, fmt)
+            for text, pub_date, author, group, image in rows:
+                writer.write(dict(zip(FIELDS, (
+                    text, pub_date.isoformat(), author, group or '', image))))
+                total += 1
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        # Отчёт идёт в stderr, чтобы не смешиваться с архивом в stdout.
+        self.stderr.write(self.style.SUCCESS(
+            f'Выгружено постов: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-6):.0f} в секунду)'))
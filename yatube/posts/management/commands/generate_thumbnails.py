@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from posts import constants
+from posts.caching import bump_feed_version
+from posts.models import Post
+from posts.thumbnails import generate_feed_thumbnail
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры для лент у всех постов с картинками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=constants.THUMBNAIL_WORKERS,
+            help='Число потоков для генерации миниатюр.')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        names = (Post.objects.exclude(image='').order_by()
+                 .values_list('image', flat=True).distinct().iterator())
+        generate = partial(generate_feed_thumbnail, notify=False)
+        total = 0
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # Берём файлы порциями, чтобы не ставить в очередь всю таблицу.
+            while True:
+                batch = list(islice(names, workers * 10))
+                if not batch:
+                    break
+                total += len(list(pool.map(generate, batch)))
+        bump_feed_version()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {total}'))
@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.archive import (FORMATS, bulk_create_dated, guess_format,
+                           read_rows)
+from posts.caching import bump_feed_version
+from posts.counters import reconcile_counters, reconcile_media_references
+from posts.models import Comment, Group, MediaFile, Post, Profile
+from posts.search import get_search_backend
+from posts.syndication import forget_feeds_of
+from posts.timeline import fan_out_posts
+
+User = get_user_model()
+
+
+class SkipRow(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Импортирует посты из JSONL или CSV пачками через bulk_create. '
+            'Файл читается построчно.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл архива или - для stdin.')
+        parser.add_argument('--format', choices=FORMATS,
+                            help='По умолчанию — по расширению файла.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Сколько постов создавать за один запрос.')
+        parser.add_argument('--images-dir',
+                            help='Каталог, от которого отсчитываются пути '
+                                 'картинок; файлы копируются в хранилище. '
+                                 'Без него пути считаются уже лежащими '
+                                 'в MEDIA_ROOT.')
+        parser.add_argument('--create-missing', action='store_true',
+                            help='Создавать неизвестных авторов и группы.')
+
+    def lookup(self, model, field):
+        return dict(model.objects.values_list(field, 'pk').iterator())
+
+    def resolve(self, table, key, create):
+        if key not in table:
+            if not self.create_missing:
+                raise SkipRow(f'нет такого объекта: {key}')
+            table[key] = create(key).pk
+        return table[key]
+
+    def create_author(self, username):
+        return User.objects.create_user(username=username)
+
+    def create_group(self, slug):
+        return Group.objects.create(title=slug, slug=slug, description='')
+
+    def inside(self, directory, path):
+        """Путь картинки, если он не выходит за пределы directory."""
+        root = os.path.realpath(directory)
+        source = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, source]) != root:
+            raise SkipRow(f'картинка вне {directory}: {path}')
+        return source
+
+    def image_name(self, path):
+        if not path:
+            return ''
+        if self.images_dir is None:
+            self.inside(settings.MEDIA_ROOT, path)
+            return path
+        source = self.inside(self.images_dir, path)
+        if not os.path.isfile(source):
+            raise SkipRow(f'нет файла картинки: {source}')
+        with open(source, 'rb') as image:
+            name = self.storage.save(
+                self.image_field.generate_filename(
+                    None, os.path.basename(path)),
+                File(image))
+        self.stored.append(name)
+        return name
+
+    def build(self, row):
+        pub_date = parse_datetime(row.get('pub_date') or '')
+        if pub_date is None:
+            pub_date = timezone.now()
+        elif timezone.is_naive(pub_date):
+            pub_date = timezone.make_aware(pub_date)
+        group = row.get('group')
+        return Post(
+            text=row['text'],
+            pub_date=pub_date,
+            author_id=self.resolve(self.authors, row['author'],
+                                   self.create_author),
+            group_id=(self.resolve(self.groups, group, self.create_group)
+                      if group else None),
+            image=self.image_name(row.get('image')),
+        )
+
+    def posts(self, rows):
+        for number, row in enumerate(rows, 1):
+            try:
+                yield self.build(row)
+            except (SkipRow, KeyError) as error:
+                self.skipped += 1
+                self.stderr.write(f'Строка {number} пропущена: {error}')
+
+    def write(self, *args):
+        """Создаёт посты в одной транзакции; возвращает их число.
+
+        Архив загружается целиком или никак: ошибка в середине файла
+        не оставляет в базе часть постов без счётчиков, поиска и лент.
+        """
+        try:
+            with transaction.atomic():
+                return self.write_batches(*args)
+        except BaseException:
+            # Откат транзакции не удаляет уже скопированные картинки.
+            for name in self.stored:
+                self.storage.delete(name)
+            raise
+
+    def write_batches(self, stream, fmt, batch_size, verbosity):
+        started = time.perf_counter()
+        total = 0
+        posts = self.posts(read_rows(stream, fmt))
+        while True:
+            batch = list(islice(posts, batch_size))
+            if not batch:
+                return total
+            bulk_create_dated(batch)
+            total += len(batch)
+            if verbosity > 1:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{total} постов, {total / elapsed:.0f} в секунду')
+
+    def refresh(self, imported, batch_size):
+        # bulk_create не вызывает сигналы, поэтому счётчики, поиск,
+        # ленты подписок, кеш страниц и RSS обновляются отдельно.
+        reconcile_counters(User, Post, Comment, Profile)
+        reconcile_media_references(Post, MediaFile)
+        get_search_backend().index_many(imported, batch_size)
+        fan_out_posts(imported)
+        bump_feed_version()
+        forget_feeds_of(imported)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or guess_format(path)
+        self.images_dir = options['images_dir']
+        self.create_missing = options['create_missing']
+        self.image_field = Post._meta.get_field('image')
+        self.storage = self.image_field.storage
+        self.stored = []
+        self.skipped = 0
+        self.authors = self.lookup(User, 'username')
+        self.groups = self.lookup(Group, 'slug')
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+        stream = (sys.stdin if path == '-'
+                  else open(path, encoding='utf-8', newline=''))
+        started = time.perf_counter()
+        try:
+            total = self.write(stream, fmt, options['batch_size'],
+                               options['verbosity'])
+        except ValueError as error:
+            raise CommandError(f'Не удалось прочитать архив: {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self.refresh(Post.objects.filter(pk__gt=last_pk),
+                     options['batch_size'])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {total} за {elapsed:.1f} с '
+            f'({total / max(elapsed, 1e-6):.0f} в секунду), '
+            f'пропущено строк: {self.skipped}'))
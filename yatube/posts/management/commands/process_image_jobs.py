@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.images import process_image_job
+from posts.models import ImageJob
+
+
+class Command(BaseCommand):
+    help = ('Обрабатывает картинки, оставшиеся в очереди после перезапуска, '
+            'и удаляет старые завершённые задачи.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes', type=int, default=30,
+            help='Через сколько минут незавершённая задача считается '
+                 'потерянной.')
+        parser.add_argument(
+            '--keep-days', type=int, default=7,
+            help='Сколько дней хранить завершённые задачи.')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        stale = now - timedelta(minutes=options['stale_minutes'])
+        pending = (ImageJob.objects
+                   .filter(status__in=(ImageJob.PENDING, ImageJob.PROCESSING),
+                           updated__lt=stale)
+                   .order_by('pk').values_list('pk', flat=True))
+        processed = 0
+        for job_id in pending:
+            process_image_job(job_id)
+            processed += 1
+
+        old = now - timedelta(days=options['keep_days'])
+        deleted, _ = ImageJob.objects.filter(
+            status__in=(ImageJob.DONE, ImageJob.FAILED),
+            updated__lt=old).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано задач: {processed}, удалено старых: {deleted}'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько постов записывать в индекс за раз.')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        backend.create_index()
+        total = backend.rebuild(Post.objects.all(), options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {total}'))
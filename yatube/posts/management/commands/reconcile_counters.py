@@ -0,0 +1,16 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile_counters
+from posts.models import Comment, Post, Profile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов и комментариев.'
+
+    def handle(self, *args, **options):
+        profiles_fixed, posts_fixed = reconcile_counters(
+            get_user_model(), Post, Comment, Profile)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено профилей: {profiles_fixed}, '
+            f'постов: {posts_fixed}'))
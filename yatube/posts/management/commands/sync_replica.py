@@ -0,0 +1,34 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from posts.routers import get_replicas
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик. Заменяет '
+            'репликацию при локальной проверке чтения с реплик.')
+
+    def handle(self, *args, **options):
+        primary = connections['default'].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Команда работает только с SQLite.')
+        replicas = get_replicas()
+        if not replicas:
+            raise CommandError('Реплики не настроены: POSTS_READ_REPLICAS.')
+        source = sqlite3.connect(primary['NAME'])
+        try:
+            for alias in replicas:
+                name = connections[alias].settings_dict['NAME']
+                if name == primary['NAME']:
+                    continue
+                connections[alias].close()
+                target = sqlite3.connect(name)
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'{alias}: {name}')
+        finally:
+            source.close()
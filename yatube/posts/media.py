@@ -0,0 +1,80 @@
+"""Учёт ссылок на файлы картинок и удаление осиротевших файлов."""
+import os
+
+from django.db.models import F
+from sorl.thumbnail import delete as delete_with_thumbnails
+from sorl.thumbnail.images import ImageFile
+
+from .models import MediaFile, Post
+
+IMAGE_FIELD = Post._meta.get_field('image')
+
+
+def add_reference(name):
+    if not name:
+        return
+    updated = MediaFile.objects.filter(name=name).update(refs=F('refs') + 1)
+    if not updated:
+        media, created = MediaFile.objects.get_or_create(
+            name=name, defaults={'refs': 1})
+        if not created:
+            MediaFile.objects.filter(pk=media.pk).update(refs=F('refs') + 1)
+
+
+def remove_reference(name):
+    if not name:
+        return
+    MediaFile.objects.filter(name=name, refs__gt=0).update(
+        refs=F('refs') - 1)
+
+
+def walk_files(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield os.path.join(directory, name)
+    for subdirectory in directories:
+        yield from walk_files(storage, os.path.join(directory, subdirectory))
+
+
+def is_stale(storage, name, older_than):
+    """Файл не менялся и не загружался повторно с older_than."""
+    return (not storage.exists(name)
+            or storage.get_modified_time(name) < older_than)
+
+
+def find_garbage(older_than):
+    """Имена файлов картинок без ссылок, созданных раньше older_than.
+
+    Это и записи MediaFile с нулём ссылок, и файлы в каталоге
+    картинок, о которых база не знает совсем. Файл, загруженный
+    повторно позже older_than, ждёт сохранения своего поста.
+    """
+    storage = IMAGE_FIELD.storage
+    for name in (MediaFile.objects.filter(refs=0, created__lt=older_than)
+                 .values_list('name', flat=True).iterator()):
+        if is_stale(storage, name, older_than):
+            yield name
+    directory = IMAGE_FIELD.upload_to.rstrip('/')
+    if not storage.exists(directory):
+        return
+    known = set(MediaFile.objects.values_list('name', flat=True).iterator())
+    for name in walk_files(storage, directory):
+        if name not in known and is_stale(storage, name, older_than):
+            yield name
+
+
+def delete_file(name, older_than):
+    """Удаляет файл, его миниатюры и запись MediaFile.
+
+    Возвращает False, если на файл успел сослаться новый пост
+    или его загрузили повторно позже older_than.
+    """
+    storage = IMAGE_FIELD.storage
+    if (Post.objects.filter(image=name).exists()
+            or not is_stale(storage, name, older_than)):
+        return False
+    if storage.exists(name):
+        delete_with_thumbnails(ImageFile(name, storage))
+    MediaFile.objects.filter(name=name, refs=0).delete()
+
+    return True
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from posts.search import get_search_backend
+
+
+def create_search_index(apps, schema_editor):
+    backend = get_search_backend()
+    backend.create_index()
+    backend.rebuild(apps.get_model('posts', 'Post').objects.all())
+
+
+def drop_search_index(apps, schema_editor):
+    get_search_backend().drop_index()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
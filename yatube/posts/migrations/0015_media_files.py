@@ -0,0 +1,38 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:27
+
+from django.db import migrations, models
+import posts.storage
+
+from posts.counters import reconcile_media_references
+
+
+def fill_references(apps, schema_editor):
+    reconcile_media_references(
+        apps.get_model('posts', 'Post'),
+        apps.get_model('posts', 'MediaFile'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_image_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaFile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Имя файла')),
+                ('refs', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.RunPython(fill_references, migrations.RunPython.noop),
+    ]
@@ -2,10 +2,39 @@ from django.db import models
 from django.contrib.auth import get_user_model
 
 from . import constants
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    """Выборки постов, согласованные с шаблонами."""
+
+    def for_feed(self):
+        """Посты для лент: всё, что нужно posts/post.html, одним запросом.
+
+        Группы не присоединяются: их проставляет posts.groups.attach_groups.
+        """
+        return self.select_related('author').only(
+            'text', 'pub_date', 'image', 'comments_count', 'group',
+            'author__username', 'author__first_name', 'author__last_name',
+        )
+
+    def for_detail(self):
+        """Пост для отдельной страницы вместе с автором и группой."""
+        return self.select_related('author', 'author__profile', 'group')
+
+
+class CommentQuerySet(models.QuerySet):
+    """Выборки комментариев, согласованные с шаблонами."""
+
+    def for_detail(self):
+        """Комментарии для страницы поста вместе с авторами."""
+        return self.select_related('author').only(
+            'text', 'created', 'post_id', 'author__username',
+        )
+
+
 class Post(models.Model):
     """Создание модели Post."""
 
@@ -24,11 +53,29 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        # Индексы по возрастанию: лента идёт по (pub_date, id) в обе
+        # стороны, и обратный проход по такому индексу даёт порядок
+        # по убыванию без сортировки во временном B-дереве.
+        indexes = (
+            models.Index(fields=('pub_date',), name='post_pub_date_idx'),
+            models.Index(fields=('author', 'pub_date'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('group', 'pub_date'),
+                         name='post_group_pub_date_idx'),
+        )
 
     def __str__(self):
         """Строковое представление объекта."""
@@ -66,9 +113,133 @@ class Comment(models.Model):
                             )
     created = models.DateTimeField('Дата', auto_now_add=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created',)
+        indexes = (
+            models.Index(fields=('post', 'created'),
+                         name='comment_post_created_idx'),
+        )
 
     def __str__(self):
         """Строковое представление объекта."""
         return self.text[:constants.SYMBOLS_IN_SELF_TEXT]
+
+
+class Profile(models.Model):
+    """Профиль пользователя с предвычисленными счётчиками."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='profile')
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0)
+
+    def __str__(self):
+        """Возвращает имя пользователя."""
+        return self.user.username
+
+
+class Follow(models.Model):
+    """Подписка пользователя user на автора author."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follower')
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='following')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'author'),
+                                    name='unique_follow'),
+            models.CheckConstraint(check=~models.Q(user=models.F('author')),
+                                   name='prevent_self_follow'),
+        )
+
+    def __str__(self):
+        """Строковое представление объекта."""
+        return f'{self.user} -> {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в предвычисленной ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(fields=('user', 'post'),
+                                    name='unique_timeline_entry'),
+        )
+
+
+class ImageJob(models.Model):
+    """Фоновая обработка картинки, загруженной к посту.
+
+    Для нового поста job хранит его текст и группу: пост создаётся,
+    только когда картинка обработана. Для существующего поста
+    картинка заменяется по готовности.
+    """
+
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (PROCESSING, 'Обрабатывается'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='image_jobs')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+        blank=True, null=True)
+    text = models.TextField('Текст поста', blank=True)
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        blank=True, null=True)
+    upload = models.FileField('Исходный файл', upload_to='uploads/')
+    status = models.CharField('Статус', max_length=10, choices=STATUSES,
+                              default=PENDING)
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+    updated = models.DateTimeField('Обновлено', auto_now=True)
+
+    def __str__(self):
+        """Строковое представление объекта."""
+        return f'{self.upload.name}: {self.status}'
+
+
+class MediaFile(models.Model):
+    """Файл картинки в хранилище и число ссылающихся на него постов."""
+
+    name = models.CharField('Имя файла', max_length=100, unique=True)
+    refs = models.PositiveIntegerField('Число ссылок', default=0)
+    created = models.DateTimeField('Создан', auto_now_add=True)
+
+    def __str__(self):
+        """Строковое представление объекта."""
+        return f'{self.name}: {self.refs}'
@@ -0,0 +1,189 @@
+import base64
+import json
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from . import constants
+
+
+def encode_cursor(value, pk, number, backwards=False):
+    """Упаковывает позицию в ленте в непрозрачный токен."""
+    payload = {'v': value.isoformat(), 'i': pk, 'n': number}
+    if backwards:
+        payload['b'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен; для битого токена возвращает None."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value = parse_datetime(payload['v'])
+        pk = int(payload['i'])
+        number = max(int(payload['n']), 1)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+    if value is None:
+        return None
+
+    return value, pk, number, bool(payload.get('b'))
+
+
+class KeysetPage(Page):
+    """Страница ленты, знающая о соседях без подсчёта всех записей.
+
+    cursor_based ложно для страниц по старым ссылкам ?page=N:
+    у них шаблон выводит номера страниц и ссылку на последнюю,
+    если число записей не упёрлось в лимит подсчёта.
+    """
+
+    cursor_based = True
+
+    def __init__(self, object_list, number, paginator,
+                 has_next, has_previous):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    @property
+    def count_unknown(self):
+        """Номера страниц неизвестны: курсор или счёт упёрся в лимит."""
+        return self.cursor_based or self.paginator.count_capped
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return (self.number - 1) * self.paginator.per_page + 1
+
+    def end_index(self):
+        return self.start_index() + len(self.object_list) - 1
+
+    @property
+    def next_cursor(self):
+        """Токен следующей страницы."""
+        if not self._has_next:
+            return None
+        last = self.object_list[-1]
+        return encode_cursor(self.paginator.key_value(last), last.pk,
+                             self.number + 1)
+
+    @property
+    def previous_cursor(self):
+        """Токен предыдущей страницы."""
+        if not self._has_previous:
+            return None
+        first = self.object_list[0]
+        return encode_cursor(self.paginator.key_value(first), first.pk,
+                             self.number - 1, backwards=True)
+
+
+class KeysetPaginator(Paginator):
+    """Пагинация по ключу (date_field, id) вместо LIMIT/OFFSET.
+
+    Страница выбирается условием «строго после последней записи
+    предыдущей страницы», поэтому глубина листания не влияет
+    на стоимость запроса, а COUNT(*) не выполняется вовсе.
+    """
+
+    def __init__(self, object_list, per_page, date_field='pub_date',
+                 approximate_count=True, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.date_field = date_field
+        self.approximate_count = approximate_count
+
+    def key_value(self, obj):
+        return getattr(obj, self.date_field)
+
+    @property
+    def ordered_list(self):
+        return self.object_list.order_by(f'-{self.date_field}', '-pk')
+
+    @cached_property
+    def count(self):
+        """Число записей; в приближённом режиме не больше лимита."""
+        if not self.approximate_count:
+            return super().count
+        limit = constants.PAGINATOR_COUNT_LIMIT
+        return self.object_list.order_by().values('pk')[:limit].count()
+
+    @property
+    def count_capped(self):
+        """Записей не меньше лимита: count и num_pages занижены."""
+        return (self.approximate_count
+                and self.count >= constants.PAGINATOR_COUNT_LIMIT)
+
+    def seek(self, value, pk, backwards=False):
+        """Записи строго после (или до) позиции value, pk."""
+        field = self.date_field
+        if backwards:
+            condition = (Q(**{f'{field}__gt': value})
+                         | Q(**{field: value, 'pk__gt': pk}))
+            return (self.object_list.filter(condition)
+                    .order_by(field, 'pk'))
+        condition = (Q(**{f'{field}__lt': value})
+                     | Q(**{field: value, 'pk__lt': pk}))
+        return self.ordered_list.filter(condition)
+
+    def get_cursor_page(self, cursor=None):
+        """Возвращает страницу по токену; без токена — первую."""
+        position = decode_cursor(cursor) if cursor else None
+        if position is None:
+            return self.first_page()
+        value, pk, number, backwards = position
+        rows = list(self.seek(value, pk, backwards)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            if not rows:
+                return self.first_page()
+            if not has_more:
+                number = 1
+            return KeysetPage(rows, number, self,
+                              has_next=True, has_previous=has_more)
+        return KeysetPage(rows, number, self,
+                          has_next=has_more, has_previous=number > 1)
+
+    def first_page(self):
+        rows = list(self.ordered_list[:self.per_page + 1])
+        return KeysetPage(rows[:self.per_page], 1, self,
+                          has_next=len(rows) > self.per_page,
+                          has_previous=False)
+
+    def get_page(self, number):
+        """Страница по номеру для старых ссылок вида ?page=N.
+
+        Использует OFFSET, но без COUNT(*): за пределами ленты
+        возвращает первую страницу.
+        """
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        offset = (number - 1) * self.per_page
+        rows = list(self.ordered_list[offset:offset + self.per_page + 1])
+        if not rows and number > 1:
+            return self.first_page()
+        page = KeysetPage(rows[:self.per_page], number, self,
+                          has_next=len(rows) > self.per_page,
+                          has_previous=number > 1)
+        page.cursor_based = False
+        return page
@@ -0,0 +1,173 @@
+"""Замеры производительности отдельных запросов.
+
+PerformanceMiddleware для части запросов (PERF_SAMPLE_RATE) считает
+запросы к БД и их время, время рендера шаблонов, попадания в кеш
+и размер ответа. Итог уходит в заголовок Server-Timing и в лог
+posts.perf одной строкой JSON. Шаблоны и кеш сообщают о себе через
+бэкенды из этого модуля, подключённые в settings.
+"""
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.core.cache.backends.locmem import LocMemCache as BaseLocMemCache
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as django_backend
+
+from . import constants
+
+logger = logging.getLogger('posts.perf')
+
+MISSING = object()
+
+current_stats = ContextVar('posts_perf_stats', default=None)
+
+
+class RequestStats:
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def server_timing(self, total_seconds):
+        return ', '.join((
+            f'db;dur={self.db_seconds * 1000:.1f};'
+            f'desc="{self.queries} queries"',
+            f'tpl;dur={self.template_seconds * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;dur={total_seconds * 1000:.1f}',
+        ))
+
+
+@contextmanager
+def timed(attribute):
+    """Прибавляет время блока к полю статистики текущего запроса."""
+    stats = current_stats.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(stats, attribute, getattr(stats, attribute)
+                + time.perf_counter() - started)
+
+
+def count_queries(execute, sql, params, many, context):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.queries += 1
+    with timed('db_seconds'):
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def counting_queries():
+    """Считает запросы всех соединений потока в статистику запроса."""
+    with ExitStack() as stack:
+        if current_stats.get() is not None:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(count_queries))
+        yield
+
+
+def count_cache_lookups(hits, misses):
+    stats = current_stats.get()
+    if stats is not None:
+        stats.cache_hits += hits
+        stats.cache_misses += misses
+
+
+class CacheStatsMixin:
+    """Считает попадания и промахи get и get_many любого бэкенда кеша."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, MISSING, version)
+        if value is MISSING:
+            count_cache_lookups(0, 1)
+            return default
+        count_cache_lookups(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = super().get_many(keys, version)
+        count_cache_lookups(len(found), len(keys) - len(found))
+        return found
+
+
+class LocMemCache(CacheStatsMixin, BaseLocMemCache):
+    pass
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with timed('template_seconds'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    """Движок шаблонов Django, замеряющий время рендера.
+
+    Замеряется только шаблон верхнего уровня, поэтому
+    вложенные include не учитываются дважды.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def response_size(response):
+    if response.streaming:
+        return None
+    return len(response.content)
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= constants.PERF_SAMPLE_RATE:
+            return self.get_response(request)
+        stats = RequestStats()
+        token = current_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            with counting_queries():
+                response = self.get_response(request)
+        finally:
+            current_stats.reset(token)
+        total = time.perf_counter() - started
+        response['Server-Timing'] = stats.server_timing(total)
+        match = request.resolver_match
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(total * 1000, 1),
+            'queries': stats.queries,
+            'db_ms': round(stats.db_seconds * 1000, 1),
+            'template_ms': round(stats.template_seconds * 1000, 1),
+            'cache_hits': stats.cache_hits,
+            'cache_misses': stats.cache_misses,
+            'response_bytes': response_size(response),
+        }))
+
+        return response
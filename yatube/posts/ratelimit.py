@@ -0,0 +1,110 @@
+"""Ограничение частоты записей: комментарии, посты, регистрация.
+
+У каждого view свой набор бюджетов: на пользователя и на IP-адрес.
+Бюджет (capacity, period) — не больше capacity записей за окно
+в period секунд; окна идут подряд от начала эпохи. Бюджеты
+по умолчанию лежат в constants.RATE_LIMITS, настройка
+POSTS_RATE_LIMITS заменяет их для отдельных view; пустой словарь
+снимает ограничение. Адрес берётся из REMOTE_ADDR: за прокси его
+должен выставлять сам прокси.
+
+Счётчик окна — ключ кеша с номером окна в имени: cache.add заводит
+его нулём на время окна, cache.incr атомарно прибавляет запрос.
+У общего SQLiteCache incr атомарен между процессами, у кеша в памяти —
+между потоками процесса. Блокировок нет, поэтому параллельные
+запросы не ждут друг друга и не получают 429 из-за них. Отклонённый
+запрос возвращает свои единицы через cache.decr. Проверка стоит
+по add и incr на бюджет и только для запросов на запись.
+"""
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.views import too_many_requests
+
+from . import constants
+
+RATE_LIMIT_KEY = 'posts:ratelimit'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def get_budgets(scope):
+    limits = getattr(settings, 'POSTS_RATE_LIMITS', {})
+    return limits.get(scope, constants.RATE_LIMITS[scope])
+
+
+def get_identities(request):
+    """Кого ограничивать: пользователя, если он вошёл, и адрес."""
+    identities = {'ip': request.META.get('REMOTE_ADDR', '')}
+    if request.user.is_authenticated:
+        identities['user'] = request.user.pk
+    return identities
+
+
+def bucket_key(scope, kind, identity):
+    return f'{RATE_LIMIT_KEY}:{scope}:{kind}.{identity}'
+
+
+def window_key(key, period, now):
+    return f'{key}:{int(now // period)}'
+
+
+def count_request(key, period):
+    """Прибавляет запрос к счётчику окна key и возвращает счётчик."""
+    cache.add(key, 0, period)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Счётчик вытеснили между add и incr: окно начинается заново.
+        cache.add(key, 1, period)
+        return 1
+
+
+def check_rate_limit(request, scope):
+    """None, если запрос укладывается в бюджеты, иначе Retry-After."""
+    budgets = get_budgets(scope)
+    identities = get_identities(request)
+    now = time.time()
+    counted = []
+    wait = 0
+    for kind, (capacity, period) in budgets.items():
+        if kind not in identities:
+            continue
+        key = window_key(bucket_key(scope, kind, identities[kind]),
+                         period, now)
+        counted.append(key)
+        if count_request(key, period) > capacity:
+            # До начала следующего окна.
+            wait = max(wait, math.ceil(period - now % period))
+    if not wait:
+        return None
+    for key in counted:
+        try:
+            cache.decr(key)
+        except ValueError:
+            pass
+
+    return max(wait, 1)
+
+
+def rate_limit(scope, respond=too_many_requests):
+    """Отвечает 429 с Retry-After на записи сверх бюджетов scope."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method in SAFE_METHODS:
+                return view(request, *args, **kwargs)
+            wait = check_rate_limit(request, scope)
+            if wait is None:
+                return view(request, *args, **kwargs)
+            response = respond(request, wait)
+            response['Retry-After'] = str(wait)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,104 @@
+"""Чтение лент с реплик базы данных.
+
+Реплики перечисляются в настройке POSTS_READ_REPLICAS. На них уходят
+только чтения внутри view, помеченных read_from_replica, и только
+если в этом запросе ничего не записывалось. После записи
+ReplicaPinMiddleware ставит cookie, и следующие REPLICA_PIN_SECONDS
+все чтения этого клиента идут в основную базу: так пользователь
+сразу видит свой пост или комментарий, даже если реплика отстаёт.
+Страницы, которые попадут в общий кэш, читаются из основной базы
+(primary_reads): иначе отстающая реплика попала бы в кэш под новой
+версией лент и её видели бы все.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import constants
+
+PIN_COOKIE = 'pin_primary'
+
+replica_reads = ContextVar('posts_replica_reads', default=False)
+request_state = ContextVar('posts_request_state', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'POSTS_READ_REPLICAS', ())
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        state = request_state.get()
+        if (not replicas or not replica_reads.get()
+                or (state is not None and state['wrote'])):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = request_state.get()
+        if state is not None:
+            state['wrote'] = True
+        # Явно, иначе Django записал бы объект, прочитанный с реплики,
+        # обратно в реплику.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """Закрепляет клиента за основной базой после его записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'wrote': False}
+        token = request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_state.reset(token)
+        if state['wrote'] and get_replicas():
+            response.set_cookie(PIN_COOKIE, '1',
+                                max_age=constants.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+
+        return response
+
+
+def read_from_replica(view):
+    """Чтения внутри view идут на реплику, если клиент не закреплён."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (request.method not in ('GET', 'HEAD')
+                or PIN_COOKIE in request.COOKIES):
+            return view(request, *args, **kwargs)
+        token = replica_reads.set(True)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            replica_reads.reset(token)
+
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Чтения внутри блока идут в основную базу и во view с репликой."""
+    token = replica_reads.set(False)
+    try:
+        yield
+    finally:
+        replica_reads.reset(token)
@@ -0,0 +1,183 @@
+import re
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+WORD_RE = re.compile(r'\w+')
+
+
+class SQLiteFTSBackend:
+    """Поиск по таблице FTS5 с копией текста постов.
+
+    Строка индекса имеет rowid, равный id поста, и обновляется
+    сигналами при сохранении и удалении поста.
+    """
+
+    table = 'posts_post_fts'
+
+    def create_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} '
+                f'USING fts5(text)')
+
+    def drop_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def index_post(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s',
+                           [post.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text])
+
+    def remove_post(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s',
+                           [pk])
+
+    def search(self, query, limit):
+        """id постов по убыванию релевантности."""
+        # Каждое слово берём в кавычки, чтобы пользовательский ввод
+        # не разбирался как синтаксис FTS5; * ищет и по началу слова.
+        match = ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s '
+                f'ORDER BY rank, rowid DESC LIMIT %s', [match, limit])
+            return [pk for pk, in cursor.fetchall()]
+
+    def index_many(self, posts, batch_size=1000):
+        """Добавляет в индекс посты выборки posts; возвращает их число."""
+        rows = posts.order_by().values_list('pk', 'text').iterator()
+        total = 0
+        with connection.cursor() as cursor:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                cursor.executemany(
+                    f'INSERT OR REPLACE INTO {self.table} (rowid, text) '
+                    f'VALUES (%s, %s)', batch)
+                total += len(batch)
+
+        return total
+
+    def rebuild(self, posts, batch_size=1000):
+        """Перестраивает индекс по выборке posts; возвращает число постов."""
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+        return self.index_many(posts, batch_size)
+
+
+class PostgresSearchBackend:
+    """Поиск по tsvector текста поста в PostgreSQL.
+
+    Вектор считается выражением, а GIN-индекс по нему PostgreSQL
+    поддерживает сам, поэтому сохранение поста ничего не делает.
+    """
+
+    config = 'russian'
+    index_name = 'posts_post_text_tsv_idx'
+
+    def create_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {self.index_name} '
+                f'ON posts_post USING GIN '
+                f"(to_tsvector('{self.config}', text))")
+
+    def drop_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP INDEX IF EXISTS {self.index_name}')
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, pk):
+        pass
+
+    def search(self, query, limit):
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVector)
+
+        from .models import Post
+
+        vector = SearchVector('text', config=self.config)
+        search_query = SearchQuery(query, config=self.config)
+        return list(
+            Post.objects.annotate(
+                document=vector, rank=SearchRank(vector, search_query))
+            .filter(document=search_query)
+            .order_by('-rank', '-pk')
+            .values_list('pk', flat=True)[:limit])
+
+    def index_many(self, posts, batch_size=1000):
+        return posts.count()
+
+    def rebuild(self, posts, batch_size=1000):
+        with connection.cursor() as cursor:
+            cursor.execute(f'REINDEX INDEX {self.index_name}')
+
+        return posts.count()
+
+
+class ContainsSearchBackend:
+    """Поиск подстрокой по тексту поста для остальных СУБД.
+
+    Индекса нет: пост подходит, если в тексте есть каждое слово
+    запроса, и выдача идёт от новых постов к старым.
+    """
+
+    def create_index(self):
+        pass
+
+    def drop_index(self):
+        pass
+
+    def index_post(self, post):
+        pass
+
+    def remove_post(self, pk):
+        pass
+
+    def search(self, query, limit):
+        from .models import Post
+
+        words = WORD_RE.findall(query)
+        if not words:
+            return []
+        posts = Post.objects.all()
+        for word in words:
+            posts = posts.filter(text__icontains=word)
+        return list(posts.order_by('-pk').values_list('pk', flat=True)[:limit])
+
+    def index_many(self, posts, batch_size=1000):
+        return posts.count()
+
+    def rebuild(self, posts, batch_size=1000):
+        return posts.count()
+
+
+BACKENDS = {
+    'sqlite': 'posts.search.SQLiteFTSBackend',
+    'postgresql': 'posts.search.PostgresSearchBackend',
+}
+DEFAULT_BACKEND = 'posts.search.ContainsSearchBackend'
+
+
+def get_search_backend():
+    """Бэкенд из настройки POSTS_SEARCH_BACKEND или по типу БД."""
+    path = getattr(settings, 'POSTS_SEARCH_BACKEND', None)
+    if path is None:
+        path = BACKENDS.get(connection.vendor, DEFAULT_BACKEND)
+
+    return import_string(path)()
@@ -0,0 +1,245 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save)
+from django.dispatch import receiver
+
+from .caching import (bump_feed_version, bump_user_version,
+                      forget_post_fragments)
+from .events import comment_event, get_broker, post_event
+from .groups import forget_groups
+from .media import add_reference, remove_reference
+from .models import Comment, Follow, Group, ImageJob, Post, Profile, User
+from .search import get_search_backend
+from .syndication import (forget_entries, forget_feeds, forget_feeds_of,
+                          post_feed_keys)
+from .timeline import (fan_out_follow, fan_out_post, fan_out_returning_author,
+                       remove_follow)
+
+# Поля пользователя, которые выводятся в карточках постов.
+AUTHOR_NAME_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+def post_scopes(post_id, author_id, *group_ids):
+    """Страницы, на которых выводится пост, для bump_feed_version."""
+    return ('index', f'post:{post_id}', f'author:{author_id}',
+            *(f'group:{group_id}' for group_id in set(group_ids)
+              if group_id is not None))
+
+
+@receiver(post_save, sender=User)
+def create_profile(sender, instance, created, **kwargs):
+    """Заводит профиль со счётчиками для нового пользователя."""
+    if created:
+        Profile.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def increment_posts_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик постов автора."""
+    if created:
+        updated = Profile.objects.filter(user_id=instance.author_id).update(
+            posts_count=F('posts_count') + 1)
+        if not updated:
+            Profile.objects.get_or_create(
+                user_id=instance.author_id,
+                defaults={'posts_count': Post.objects.filter(
+                    author_id=instance.author_id).count()})
+
+
+@receiver(post_delete, sender=Post)
+def decrement_posts_count(sender, instance, **kwargs):
+    """Уменьшает счётчик постов автора."""
+    Profile.objects.filter(
+        user_id=instance.author_id, posts_count__gt=0
+    ).update(posts_count=F('posts_count') - 1)
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_values(sender, instance, update_fields=None, **kwargs):
+    """Запоминает прежние картинку и группу поста.
+
+    Картинка нужна для учёта ссылок, группа — чтобы сбросить RSS
+    группы, из которой пост ушёл.
+    """
+    if instance.pk is None:
+        previous = ('', None)
+    elif update_fields is not None and not {'image', 'group'} & set(
+            update_fields):
+        previous = (instance.image.name, instance.group_id)
+    else:
+        previous = (Post.objects.filter(pk=instance.pk)
+                    .values_list('image', 'group_id').first() or ('', None))
+    instance._previous_image = previous[0] or ''
+    instance._previous_group_id = previous[1]
+
+
+@receiver(post_save, sender=Post)
+def count_image_references(sender, instance, **kwargs):
+    """Переносит ссылку поста со старой картинки на новую."""
+    previous = getattr(instance, '_previous_image', '')
+    current = instance.image.name or ''
+    if previous != current:
+        add_reference(current)
+        remove_reference(previous)
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    """Убирает ссылку удалённого поста на картинку."""
+    remove_reference(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def increment_comments_count(sender, instance, created, **kwargs):
+    """Увеличивает счётчик комментариев поста."""
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comments_count(sender, instance, **kwargs):
+    """Уменьшает счётчик комментариев поста."""
+    Post.objects.filter(
+        pk=instance.post_id, comments_count__gt=0
+    ).update(comments_count=F('comments_count') - 1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    """Раскладывает новый пост по лентам подписчиков."""
+    if created:
+        fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    """Учитывает нового подписчика и заполняет его ленту."""
+    if created:
+        Profile.objects.filter(user_id=instance.author_id).update(
+            followers_count=F('followers_count') + 1)
+        fan_out_follow(instance)
+        bump_feed_version(f'author:{instance.author_id}')
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    """Учитывает отписку и чистит ленту бывшего подписчика."""
+    Profile.objects.filter(
+        user_id=instance.author_id, followers_count__gt=0
+    ).update(followers_count=F('followers_count') - 1)
+    remove_follow(instance)
+    fan_out_returning_author(instance.author_id)
+    bump_feed_version(f'author:{instance.author_id}')
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    """Обновляет пост в полнотекстовом индексе."""
+    get_search_backend().index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    """Убирает пост из полнотекстового индекса."""
+    get_search_backend().remove_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_cache(sender, instance, **kwargs):
+    """Сбрасывает ленты и фрагмент изменённого поста."""
+    forget_post_fragments(instance.pk)
+    bump_feed_version(*post_scopes(
+        instance.pk, instance.author_id, instance.group_id,
+        getattr(instance, '_previous_group_id', None)))
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cache(sender, instance, created, update_fields=None,
+                            **kwargs):
+    """Сбрасывает ленты, RSS и фрагменты постов автора: в них его имя.
+
+    Вход пользователя сохраняет только last_login и ничего не сбрасывает.
+    """
+    if created or (update_fields is not None and not AUTHOR_NAME_FIELDS
+                   & set(update_fields)):
+        return
+    post_ids = list(instance.posts.values_list('pk', flat=True))
+    forget_post_fragments(*post_ids)
+    forget_entries(*post_ids)
+    forget_feeds_of(instance.posts.all())
+    bump_feed_version()
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_cache(sender, instance, **kwargs):
+    """Сбрасывает ленты и фрагменты постов группы."""
+    forget_post_fragments(*instance.posts.values_list('pk', flat=True))
+    bump_feed_version()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_directory(sender, instance, **kwargs):
+    """Сбрасывает справочник групп во всех процессах.
+
+    После фиксации: иначе другой процесс успел бы перечитать группы
+    до неё и запомнить старые под новой версией.
+    """
+    transaction.on_commit(forget_groups)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_cache(sender, instance, **kwargs):
+    """Сбрасывает ленты и фрагмент прокомментированного поста."""
+    forget_post_fragments(instance.post_id)
+    post = Post.objects.filter(pk=instance.post_id).values_list(
+        'author_id', 'group_id').first()
+    if post is None:
+        # Пост удаляется вместе с комментариями и сбросит всё сам.
+        bump_feed_version(f'post:{instance.post_id}')
+    else:
+        bump_feed_version(*post_scopes(instance.post_id, *post))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_syndication(sender, instance, **kwargs):
+    """Сбрасывает запись поста и ленты RSS и Atom, где он есть."""
+    forget_entries(instance.pk)
+    forget_feeds(*post_feed_keys(
+        instance, [getattr(instance, '_previous_group_id', None)]))
+
+
+@receiver(post_save, sender=ImageJob)
+def invalidate_image_job_pages(sender, instance, **kwargs):
+    """Загрузки автора видны в его профиле: новая задача и смена
+    статуса сбрасывают страницы, закэшированные для автора."""
+    bump_user_version(instance.author_id)
+
+
+@receiver(post_save, sender=Group)
+def invalidate_group_syndication(sender, instance, **kwargs):
+    """Сбрасывает ленту группы: в ней её название и описание."""
+    forget_feeds(f'group:{instance.pk}')
+
+
+@receiver(post_save, sender=Post)
+def publish_new_post(sender, instance, created, **kwargs):
+    """Сообщает подписчикам потока событий о новом посте."""
+    if created:
+        data = post_event(instance)
+        transaction.on_commit(lambda: get_broker().publish('post', data))
+
+
+@receiver(post_save, sender=Comment)
+def publish_new_comment(sender, instance, created, **kwargs):
+    """Сообщает подписчикам потока событий о новом комментарии."""
+    if created:
+        data = comment_event(instance)
+        transaction.on_commit(
+            lambda: get_broker().publish('comment', data))
@@ -0,0 +1,42 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла — SHA-256 его содержимого.
+
+    Картинка сохраняется как <каталог>/<ab>/<digest><расширение>,
+    где каталог берётся из upload_to. Повторная загрузка того же
+    файла не создаёт копию и возвращает имя уже сохранённого;
+    миниатюры sorl строятся по имени и тоже оказываются общими.
+    Файлы не удаляются при удалении постов: это делает команда
+    collect_media по счётчикам ссылок MediaFile.
+    """
+
+    def digest_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+
+        return os.path.join(directory, hexdigest[:2], hexdigest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.digest_name(name, content)
+        if self.exists(name):
+            os.utime(self.path(name))
+            return name
+
+        return super().save(name, content, max_length)
@@ -0,0 +1,221 @@
+"""Ленты RSS и Atom главной страницы, групп и авторов.
+
+Читатели лент опрашивают их постоянно, поэтому у каждой ленты своё
+состояние в кеше: номер версии и время изменения. Сигналы меняют его,
+только когда меняется пост этой ленты. Пока версия прежняя, XML
+берётся из кеша без запросов к БД, а по ETag и Last-Modified
+отвечается 304. Записи лент тоже кешируются по одной, так что при
+новом посте из базы читается только он и список последних id.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.defaultfilters import linebreaksbr
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.text import Truncator
+from django.views.decorators.http import condition, require_safe
+
+from . import constants
+from .groups import get_group_or_404
+from .models import Post, User
+
+FEED_TYPES = {'rss': Rss201rev2Feed, 'atom': Atom1Feed}
+
+
+def state_key(feed_key):
+    return f'posts:syndication:{feed_key}'
+
+
+def entry_key(post_id):
+    return f'posts:syndication:entry:{post_id}'
+
+
+def get_feed_state(feed_key, create=True):
+    """Версия и время последнего изменения ленты.
+
+    Без create для ленты, которой ещё нет в кеше, возвращает None.
+    """
+    state = cache.get(state_key(feed_key))
+    if state is None and create:
+        cache.add(state_key(feed_key),
+                  {'version': time.time_ns(), 'modified': time.time()}, None)
+        state = cache.get(state_key(feed_key))
+
+    return state
+
+
+def forget_feeds(*feed_keys):
+    """Помечает ленты изменёнными: XML соберётся заново."""
+    state = {'version': time.time_ns(), 'modified': time.time()}
+    cache.set_many({state_key(key): state for key in feed_keys}, None)
+
+
+def forget_entries(*post_ids):
+    cache.delete_many([entry_key(post_id) for post_id in post_ids])
+
+
+def forget_feeds_of(post_list):
+    """Сбрасывает ленты всех постов выборки, например после импорта."""
+    keys = {'index'}
+    for username, group_id in (post_list.order_by()
+                               .values_list('author__username', 'group_id')
+                               .distinct()):
+        keys.add(f'author:{username}')
+        if group_id:
+            keys.add(f'group:{group_id}')
+    forget_feeds(*keys)
+
+
+def post_feed_keys(post, group_ids=()):
+    """Ленты, в которые попадает пост."""
+    keys = {'index', f'author:{post.author.username}'}
+    keys.update(f'group:{group_id}'
+                for group_id in (post.group_id, *group_ids) if group_id)
+
+    return keys
+
+
+def render_entry(post):
+    return {
+        'title': Truncator(post.text).chars(
+            constants.SYNDICATION_TITLE_LENGTH),
+        'link': reverse('posts:post_detail', kwargs={'post_id': post.pk}),
+        'description': linebreaksbr(post.text),
+        'pubdate': post.pub_date.isoformat(),
+        'author': post.author.get_full_name() or post.author.username,
+    }
+
+
+def get_entries(post_list):
+    """Последние записи ленты; из БД читаются только новые посты."""
+    ids = list(post_list.order_by('-pub_date', '-pk').values_list(
+        'pk', flat=True)[:constants.SYNDICATION_ENTRIES])
+    cached = cache.get_many([entry_key(pk) for pk in ids])
+    missing = [pk for pk in ids if entry_key(pk) not in cached]
+    if missing:
+        rendered = {
+            entry_key(pk): render_entry(post)
+            for pk, post in Post.objects.for_feed().in_bulk(missing).items()}
+        cache.set_many(rendered, constants.SYNDICATION_CACHE_SECONDS)
+        cached.update(rendered)
+
+    return [cached[entry_key(pk)] for pk in ids if entry_key(pk) in cached]
+
+
+def build_feed(request, feed_type, title, link, description, post_list):
+    feed = feed_type(
+        title=title,
+        link=request.build_absolute_uri(link),
+        description=description,
+        feed_url=request.build_absolute_uri(),
+        language='ru',
+    )
+    for entry in get_entries(post_list):
+        url = request.build_absolute_uri(entry['link'])
+        feed.add_item(
+            title=entry['title'],
+            link=url,
+            unique_id=url,
+            description=entry['description'],
+            pubdate=parse_datetime(entry['pubdate']),
+            author_name=entry['author'],
+        )
+
+    return feed.writeString('utf-8')
+
+
+def feed_view(describe):
+    """Превращает describe(request, **kwargs) в закешированную ленту.
+
+    describe возвращает ключ ленты и функцию, которая без аргументов
+    отдаёт заголовок, ссылку, описание и выборку постов; она
+    вызывается, только если XML нужно собрать заново.
+    """
+
+    def state(request, feed_format, **kwargs):
+        if not hasattr(request, 'syndication_state'):
+            if feed_format not in FEED_TYPES:
+                raise Http404('Неизвестный формат ленты.')
+            feed_key, details = describe(request, **kwargs)
+            request.syndication_state = (
+                feed_key, details, get_feed_state(feed_key))
+        return request.syndication_state
+
+    def xml_key(request, feed_format, **kwargs):
+        feed_key, _, feed_state = state(request, feed_format, **kwargs)
+        host = hashlib.md5(
+            request.build_absolute_uri('/').encode()).hexdigest()
+        return (f'posts:syndication:xml:{feed_key}:{feed_format}:'
+                f'{feed_state["version"]}:{host}')
+
+    def etag(request, **kwargs):
+        return hashlib.md5(xml_key(request, **kwargs).encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        # Как и у страниц лент: в первую секунду после изменения
+        # Last-Modified не отдаётся, см. caching.last_modified.
+        modified = state(request, **kwargs)[2]['modified']
+        if time.time() - modified < 1:
+            return None
+        return datetime.fromtimestamp(modified, timezone.utc)
+
+    @wraps(describe)
+    @require_safe
+    @condition(etag_func=etag, last_modified_func=last_modified)
+    def view(request, feed_format, **kwargs):
+        feed_type = FEED_TYPES[feed_format]
+        key = xml_key(request, feed_format, **kwargs)
+        xml = cache.get(key)
+        if xml is None:
+            details = state(request, feed_format, **kwargs)[1]
+            xml = build_feed(request, feed_type, *details())
+            cache.set(key, xml, constants.SYNDICATION_CACHE_SECONDS)
+
+        return HttpResponse(xml, content_type=feed_type.content_type)
+
+    return view
+
+
+@feed_view
+def index_feed(request):
+    """Лента последних постов сайта."""
+    return 'index', lambda: (
+        'Yatube: последние обновления', reverse('posts:index'),
+        'Последние записи на сайте.', Post.objects.all())
+
+
+@feed_view
+def group_feed(request, slug):
+    """Лента постов группы."""
+    group = get_group_or_404(slug)
+
+    return f'group:{group.pk}', lambda: (
+        f'Yatube: {group.title}',
+        reverse('posts:group_list', kwargs={'slug': slug}),
+        group.description, Post.objects.filter(group_id=group.pk))
+
+
+@feed_view
+def profile_feed(request, username):
+    """Лента постов автора."""
+    feed_key = f'author:{username}'
+    if get_feed_state(feed_key, create=False) is None:
+        # Состояние без срока хранения заводится только для автора,
+        # который есть в базе.
+        get_object_or_404(User, username=username)
+
+    def details():
+        author = get_object_or_404(User, username=username)
+        return (f'Yatube: {author.get_full_name() or username}',
+                reverse('posts:profile', kwargs={'username': username}),
+                f'Записи пользователя {username}.',
+                Post.objects.filter(author=author))
+
+    return feed_key, details
@@ -0,0 +1,15 @@
+from django import template
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def page_url(context, **params):
+    """Адрес страницы: текущие GET-параметры с новой позицией в ленте."""
+    query = context['request'].GET.copy()
+    for key in ('cursor', 'page'):
+        query.pop(key, None)
+    for key, value in params.items():
+        query[key] = value
+
+    return f'?{query.urlencode()}'
@@ -0,0 +1,11 @@
+from django import template
+
+from ..thumbnails import get_feed_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def feed_thumbnail(post):
+    """Миниатюра для лент или None, пока она создаётся в фоне."""
+    return get_feed_thumbnail(post)
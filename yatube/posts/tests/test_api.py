@@ -0,0 +1,113 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import constants
+from ..models import Comment, Group, Post, Profile
+
+User = get_user_model()
+
+
+class ApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='описание')
+        self.posts = [Post.objects.create(
+            author=self.author, text=f'text {number}', group=self.group)
+            for number in range(constants.POSTS_PER_PAGE + 2)]
+        self.client.force_login(self.author)
+
+    def get_json(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_posts_cursor_and_fields(self):
+        """Лента листается курсором, fields= сокращает ответ."""
+        url = reverse('posts:api_posts')
+        first = self.get_json(url, fields='id,group')
+        self.assertEqual(len(first['results']), constants.POSTS_PER_PAGE)
+        self.assertEqual(first['results'][0],
+                         {'id': self.posts[-1].pk, 'group': 'group'})
+        second = self.get_json(url, cursor=first['next'])
+        self.assertEqual([post['id'] for post in second['results']],
+                         [post.pk for post in reversed(self.posts[:2])])
+        self.assertIsNone(second['next'])
+        self.assertEqual(second['results'][0]['author'], 'author')
+        response = self.client.get(url, {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['fields'], ['secret'])
+
+    def test_read_endpoints(self):
+        """Группы, профиль и комментарии отдаются в JSON."""
+        Comment.objects.create(post=self.posts[0], author=self.author,
+                               text='comment')
+        groups = self.get_json(reverse('posts:api_groups'), fields='slug')
+        self.assertEqual(groups['results'], [{'slug': 'group'}])
+        profile = self.get_json(
+            reverse('posts:api_profile', kwargs={'username': 'author'}))
+        self.assertEqual(profile['posts_count'], len(self.posts))
+        comments = self.get_json(reverse(
+            'posts:api_comments', kwargs={'post_id': self.posts[0].pk}))
+        self.assertEqual(comments['results'][0]['text'], 'comment')
+        response = self.client.get(
+            reverse('posts:api_group', kwargs={'slug': 'missing'}))
+        self.assertEqual(response.status_code, 404)
+        self.assertIn('error', response.json())
+
+    def test_write_endpoints(self):
+        """Автор создаёт, меняет и удаляет пост; чужой — нет."""
+        response = self.client.post(
+            reverse('posts:api_posts'),
+            json.dumps({'text': 'из API', 'group': 'group'}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        post_id = response.json()['id']
+        url = reverse('posts:api_post', kwargs={'post_id': post_id})
+        response = self.client.patch(
+            url, json.dumps({'group': None}),
+            content_type='application/json')
+        self.assertEqual(response.json()['text'], 'из API')
+        self.assertIsNone(response.json()['group'])
+        response = self.client.post(
+            reverse('posts:api_comments', kwargs={'post_id': post_id}),
+            {'text': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.json()['errors'])
+        other = Client()
+        other.force_login(User.objects.create(username='other'))
+        self.assertEqual(other.delete(url).status_code, 403)
+        self.assertEqual(Client().delete(url).status_code, 401)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Post.objects.filter(pk=post_id).exists())
+
+    def test_non_string_fields_rejected(self):
+        """Текст и группа не строками — ошибка 400, а не 500."""
+        url = reverse('posts:api_posts')
+        for data in ({'text': 'текст', 'group': ['group']},
+                     {'text': 'текст', 'group': {}},
+                     {'text': {'a': 1}}):
+            with self.subTest(data=data):
+                response = self.client.post(
+                    url, json.dumps(data), content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('fields', response.json())
+        response = self.client.post(
+            reverse('posts:api_comments',
+                    kwargs={'post_id': self.posts[0].pk}),
+            json.dumps({'text': 1}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Comment.objects.exists())
+
+    def test_profile_without_counters(self):
+        """Профиль пользователя без счётчиков отдаёт нули."""
+        Profile.objects.filter(user=self.author).delete()
+        data = self.get_json(reverse('posts:api_profile',
+                                     kwargs={'username': 'author'}))
+        self.assertEqual(
+            (data['posts_count'], data['followers_count']), (0, 0))
@@ -0,0 +1,104 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from ..models import Group, Post
+from ..search import get_search_backend
+
+User = get_user_model()
+
+
+class PostArchiveTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(
+            title='test title', slug='test-slug', description='')
+        Post.objects.create(author=self.user, group=self.group,
+                            text='первый пост')
+        Post.objects.create(author=self.user, text='второй, с "кавычками"')
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def round_trip(self, name):
+        path = os.path.join(self.directory, name)
+        call_command('export_posts', path, stderr=StringIO())
+        exported = list(Post.objects.order_by('pk').values_list(
+            'text', 'pub_date', 'author', 'group'))
+        Post.objects.all().delete()
+        call_command('import_posts', path, '--batch-size', '1',
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(list(Post.objects.order_by('pk').values_list(
+            'text', 'pub_date', 'author', 'group')), exported)
+
+    def test_jsonl_round_trip(self):
+        """Выгрузка в JSONL и загрузка обратно сохраняют посты."""
+        self.round_trip('posts.jsonl')
+
+    def test_csv_round_trip(self):
+        """Выгрузка в CSV и загрузка обратно сохраняют посты."""
+        self.round_trip('posts.csv')
+
+    def test_import_updates_counters_and_search(self):
+        """После импорта счётчики и поиск учитывают новые посты."""
+        path = os.path.join(self.directory, 'posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as archive:
+            archive.write('{"text": "импортированный", "author": "new", '
+                          '"group": "new-group"}\n')
+            archive.write('{"text": "без автора", "author": "ghost"}\n')
+        err = StringIO()
+        call_command('import_posts', path, stdout=StringIO(), stderr=err)
+        self.assertFalse(Post.objects.filter(text='импортированный').exists())
+        self.assertIn('Строка 1 пропущена', err.getvalue())
+        call_command('import_posts', path, '--create-missing',
+                     stdout=StringIO(), stderr=StringIO())
+        author = User.objects.get(username='new')
+        self.assertEqual(author.profile.posts_count, 1)
+        self.assertTrue(Group.objects.filter(slug='new-group').exists())
+        post = Post.objects.get(text='импортированный')
+        self.assertIn(post.pk, get_search_backend().search('импорт', 10))
+
+    def write_archive(self, name, *lines):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as archive:
+            archive.write(''.join(line + '\n' for line in lines))
+        return path
+
+    def test_broken_archive_imports_nothing(self):
+        """Ошибка в середине архива откатывает уже созданные пачки."""
+        path = self.write_archive(
+            'posts.csv', 'text,author', 'первый,auth', 'второй,auth',
+            'короткая строка')
+        with self.assertRaisesMessage(CommandError, 'строка 4'):
+            call_command('import_posts', path, '--batch-size', '1',
+                         stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(Post.objects.filter(text='первый').exists())
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_csv_without_required_columns(self):
+        """CSV без обязательного столбца не импортируется."""
+        path = self.write_archive('posts.csv', 'text,group', 'пост,')
+        with self.assertRaisesMessage(CommandError, 'нет столбцов: author'):
+            call_command('import_posts', path,
+                         stdout=StringIO(), stderr=StringIO())
+
+    def test_image_outside_media_root_skipped(self):
+        """Пути картинок вне MEDIA_ROOT и --images-dir отвергаются."""
+        path = self.write_archive(
+            'posts.jsonl',
+            '{"text": "чужой файл", "author": "auth", '
+            '"image": "../settings.py"}',
+            '{"text": "абсолютный путь", "author": "auth", '
+            '"image": "/etc/passwd"}')
+        err = StringIO()
+        call_command('import_posts', path, stdout=StringIO(), stderr=err)
+        call_command('import_posts', path, '--images-dir', self.directory,
+                     stdout=StringIO(), stderr=err)
+        self.assertFalse(Post.objects.filter(author=self.user)
+                         .exclude(image='').exists())
+        self.assertEqual(err.getvalue().count('картинка вне'), 4)
@@ -0,0 +1,134 @@
+import asyncio
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import Http404, HttpResponse
+from django.test import RequestFactory, TestCase
+
+from .. import async_views, constants
+from ..asgi import (ASGI_KEY, ASGIHandler, async_variant, get_environ,
+                    read_body)
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@mock.patch.object(constants, 'ASYNC_VIEW_WORKERS', 0)
+class AsgiTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='описание')
+        self.post = Post.objects.create(
+            author=self.author, text='пост в группе', group=self.group)
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='комментарий')
+        self.factory = RequestFactory()
+
+    def get(self, view, **kwargs):
+        request = self.factory.get('/')
+        request.user = self.author
+        return asyncio.run(view(request, **kwargs))
+
+    def test_async_views_render_pages(self):
+        """Асинхронные версии страниц выводят те же данные."""
+        pages = (
+            (async_views.index, {}, 'пост в группе'),
+            (async_views.group_posts, {'slug': 'group'}, 'пост в группе'),
+            (async_views.profile, {'username': 'author'}, 'пост в группе'),
+            (async_views.post_detail, {'post_id': self.post.pk},
+             'комментарий'),
+        )
+        for view, kwargs, text in pages:
+            with self.subTest(view=view.__name__):
+                self.assertContains(self.get(view, **kwargs), text)
+        missing = (
+            (async_views.group_posts, {'slug': 'missing'}),
+            (async_views.profile, {'username': 'missing'}),
+            (async_views.post_detail, {'post_id': self.post.pk + 1}),
+        )
+        for view, kwargs in missing:
+            with self.subTest(view=view.__name__):
+                with self.assertRaises(Http404):
+                    self.get(view, **kwargs)
+
+    def test_async_variant_runs_on_server_loop(self):
+        """С циклом сервера в запросе выполняется асинхронная версия."""
+
+        async def async_view(request):
+            return HttpResponse('async')
+
+        view = async_variant(async_view)(lambda request: HttpResponse('sync'))
+        request = self.factory.get('/')
+        self.assertContains(view(request), 'sync')
+
+        request.META[ASGI_KEY] = True
+        response = asyncio.run(
+            sync_to_async(view, thread_sensitive=False)(request))
+        self.assertContains(response, 'async')
+
+    def test_handler_serves_request(self):
+        """ASGIHandler отвечает на запрос как WSGI-приложение Django."""
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/about/author/',
+            'query_string': b'', 'headers': [(b'host', b'testserver')],
+        }
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(ASGIHandler()(scope, receive, send))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertFalse(sent[-1].get('more_body', False))
+        self.assertTrue(b''.join(message.get('body', b'')
+                                 for message in sent[1:]))
+
+    def test_request_body_closed(self):
+        """Временный файл тела закрывается после ответа и при обрыве."""
+        scope = {
+            'type': 'http', 'method': 'POST', 'path': '/about/author/',
+            'query_string': b'', 'headers': [(b'host', b'testserver')],
+        }
+        files = []
+
+        def spooled(*args, **kwargs):
+            files.append(SpooledTemporaryFile(*args, **kwargs))
+            return files[-1]
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'text=1'}
+
+        async def send(message):
+            pass
+
+        async def broken():
+            raise ConnectionResetError
+
+        with mock.patch('posts.asgi.SpooledTemporaryFile', spooled):
+            asyncio.run(ASGIHandler()(scope, receive, send))
+            with self.assertRaises(ConnectionResetError):
+                asyncio.run(read_body(broken))
+        self.assertEqual(len(files), 2)
+        self.assertTrue(all(body.closed for body in files))
+
+    def test_environ_from_scope(self):
+        """Путь, заголовки и cookie переносятся в WSGI-окружение."""
+        environ = get_environ({
+            'method': 'POST', 'path': '/group/тест/',
+            'query_string': b'page=2', 'client': ('10.0.0.1', 5000),
+            'headers': [(b'content-type', b'text/plain'),
+                        (b'cookie', b'a=1'), (b'cookie', b'b=2')],
+        }, BytesIO())
+        self.assertEqual(environ['PATH_INFO'],
+                         '/group/тест/'.encode().decode('latin-1'))
+        self.assertEqual(environ['QUERY_STRING'], 'page=2')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_COOKIE'], 'a=1; b=2')
+        self.assertEqual(environ['REMOTE_ADDR'], '10.0.0.1')
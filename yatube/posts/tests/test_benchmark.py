@@ -0,0 +1,69 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import benchmark
+from ..models import Post
+
+
+class BenchmarkTest(TestCase):
+    def test_measure_views(self):
+        """Замер страниц возвращает статус, задержки и число запросов."""
+        author, group, post = benchmark.seed(30, authors=3, groups=2,
+                                             comments=5)
+        self.assertEqual(Post.objects.count(), 30)
+        # Посты идут в ленте в порядке создания, у каждого своя дата.
+        dates = list(Post.objects.order_by('pk').values_list(
+            'pub_date', flat=True))
+        self.assertEqual(dates, sorted(set(dates)))
+        driver = benchmark.ClientDriver(author)
+        with benchmark.isolated():
+            results = benchmark.run(
+                driver, benchmark.scenarios(author, group, post), repeat=3)
+            warm = benchmark.run(
+                driver, benchmark.scenarios(author, group, post), repeat=3,
+                warm=True)
+        self.assertEqual(results['index']['status'], 200)
+        self.assertEqual(results['add_comment']['status'], 302)
+        self.assertEqual(warm['api_add_comment']['status'], 201)
+        for stats in results.values():
+            self.assertLessEqual(stats['p50_ms'], stats['p99_ms'])
+            self.assertGreater(stats['queries'], 0)
+
+    @override_settings(POSTS_RATE_LIMITS={'add_comment': {'user': (1, 60)}})
+    def test_unexpected_status_fails_measure(self):
+        """Ответ 429 вместо ожидаемого прерывает замер вне isolated()."""
+        author, group, post = benchmark.seed(3, authors=1, groups=1)
+        driver = benchmark.ClientDriver(author)
+        cases = [case for case in benchmark.scenarios(author, group, post)
+                 if case[0] == 'add_comment']
+        with self.assertRaisesMessage(RuntimeError, '429'):
+            benchmark.run(driver, cases, repeat=3, warm=True)
+        with benchmark.isolated():
+            results = benchmark.run(driver, cases, repeat=3, warm=True)
+        self.assertEqual(results['add_comment']['status'], 302)
+
+    def test_compare_finds_regressions(self):
+        """Сравнение отмечает рост задержки и числа запросов."""
+        baseline = {'views': {
+            'index': {'p50_ms': 10, 'queries': 3},
+            'profile': {'p50_ms': 10, 'queries': 3},
+        }}
+        current = {'views': {
+            'index': {'p50_ms': 11, 'queries': 3},
+            'profile': {'p50_ms': 10, 'queries': 4},
+        }}
+        lines, regressions = benchmark.compare(current, baseline, 0.2)
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(regressions, ['profile'])
+
+
+class TemplatesBenchmarkTest(TestCase):
+    def test_benchmark_templates(self):
+        """Замер рендера выводит строки для обоих наборов настроек."""
+        out = StringIO()
+        call_command('benchmark_templates', '--repeat', '2', stdout=out)
+        self.assertIn('текущие', out.getvalue())
+        self.assertIn('боевые', out.getvalue())
+        self.assertFalse(Post.objects.exists())
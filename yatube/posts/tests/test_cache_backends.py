@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from ..cache_backends import SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path, ignore_errors=True)
+
+    def make_cache(self, **params):
+        return SQLiteCache(os.path.join(self.path, 'cache.sqlite3'), params)
+
+    def test_shared_between_instances(self):
+        """Запись одного экземпляра видна другому, как другому процессу."""
+        first, second = self.make_cache(), self.make_cache()
+        first.set('page', (b'<html>', 'text/html'))
+        first.set('version', 1, None)
+        self.assertEqual(second.get('page'), [b'<html>', 'text/html'])
+        self.assertEqual(second.incr('version'), 2)
+        self.assertEqual(first.get('version'), 2)
+        self.assertFalse(second.add('version', 10))
+        second.delete('page')
+        self.assertIsNone(first.get('page'))
+
+    def test_values_without_pickle(self):
+        """В кеш попадают только значения, которые переводятся в JSON."""
+        cache = self.make_cache()
+        with self.assertRaises(TypeError):
+            cache.set('object', object())
+        cache.set('expired', 'value', -1)
+        self.assertEqual(cache.get_many(['expired', 'missing']), {})
+
+    def test_release_prefix_separates_keys(self):
+        """Новый релиз не видит ключей, записанных прежним."""
+        self.make_cache(KEY_PREFIX='1').set('page', 'old')
+        self.assertIsNone(self.make_cache(KEY_PREFIX='2').get('page'))
+
+    def test_cull(self):
+        """При переполнении удаляются самые старые записи."""
+        cache = self.make_cache(
+            OPTIONS={'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2})
+        for number in range(6):
+            cache.set(f'key{number}', number)
+        self.assertIsNone(cache.get('key0'))
+        self.assertEqual(cache.get('key5'), 5)
+
+    def test_cull_frequency_zero_clears_cache(self):
+        """CULL_FREQUENCY=0 при переполнении очищает кеш целиком."""
+        cache = self.make_cache(
+            OPTIONS={'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 0})
+        for number in range(6):
+            cache.set(f'key{number}', number)
+        self.assertEqual(
+            cache.get_many([f'key{number}' for number in range(6)]),
+            {'key5': 5})
@@ -0,0 +1,90 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import caching
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='author')
+        self.other = User.objects.create(username='other')
+        self.post = Post.objects.create(author=self.user, text='text')
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+        )
+
+    def test_not_modified_without_rendering(self):
+        """Повторный запрос с ETag получает 304 без рендера шаблонов."""
+        Group.objects.create(title='group', slug='group', description='')
+        group = reverse('posts:group_list', kwargs={'slug': 'group'})
+        for url in (*self.urls, group):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+
+    def test_changes_invalidate_etag(self):
+        """Новый комментарий и другой пользователь меняют ETag."""
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.user, text='new')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_without_page_cache(self):
+        """ETag не зависит от кэша страниц: 304 и после его очистки."""
+        response = self.client.get(self.urls[0])
+        cache.delete(caching.feed_page_key(response.wsgi_request))
+        response = self.client.get(
+            self.urls[0], HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_post_page_conditional_for_anonymous(self):
+        """Страница поста отвечает 304 анонимам и меняется с комментарием."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+        # Пост в другой ленте не трогает страницу этого поста.
+        Post.objects.create(author=self.other, text='other')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Comment.objects.create(post=self.post, author=self.user, text='new')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.client.force_login(self.user)
+        self.assertFalse(self.client.get(url).has_header('ETag'))
+
+    def test_if_modified_since(self):
+        """Last-Modified у каждой страницы свой: новый пост не трогает
+        профиль другого автора."""
+        profile = reverse('posts:profile', kwargs={'username': 'other'})
+        past = time.time() - 10
+        for scope in (None, 'index', f'author:{self.user.pk}',
+                      f'author:{self.other.pk}'):
+            cache.set(caching.modified_key(scope), past, None)
+        modified = self.client.get(profile)['Last-Modified']
+        Post.objects.create(author=self.user, text='new post')
+        response = self.client.get(profile, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 304)
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=modified)
+                self.assertEqual(response.status_code, 200)
+                self.assertFalse(response.has_header('Last-Modified'))
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import constants
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class CommentsPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='test_username')
+        cls.post = Post.objects.create(author=cls.user, text='test post')
+        Comment.objects.bulk_create([
+            Comment(post=cls.post, author=cls.user, text=f'comment {i}')
+            for i in range(constants.COMMENTS_PER_PAGE + 3)
+        ])
+
+    def test_post_detail_shows_first_batch(self):
+        """На странице поста выводится первая порция комментариев."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), constants.COMMENTS_PER_PAGE)
+        self.assertTrue(comments.has_next())
+
+    def test_comments_more_returns_next_batch(self):
+        """JSON-эндпоинт отдаёт оставшиеся комментарии."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        cursor = response.context['comments'].next_cursor
+        response = self.client.get(
+            reverse('posts:comments_more', kwargs={'post_id': self.post.id}),
+            {'cursor': cursor})
+        data = response.json()
+        self.assertIsNone(data['next'])
+        self.assertEqual(data['html'].count('media-body'), 3)
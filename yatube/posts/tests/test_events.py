@@ -0,0 +1,94 @@
+import asyncio
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import constants
+from ..asgi import ASGIHandler
+from ..events import LocalBroker
+from ..models import Post
+
+User = get_user_model()
+
+
+@mock.patch.object(constants, 'EVENTS_STREAM_SECONDS', 0.01)
+@mock.patch.object(constants, 'EVENTS_HEARTBEAT_SECONDS', 0)
+class EventsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.client.force_login(self.author)
+        self.broker = LocalBroker()
+        patcher = mock.patch('posts.signals.get_broker',
+                             return_value=self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def read_stream(self, **params):
+        with mock.patch('posts.events.get_broker', return_value=self.broker):
+            response = self.client.get(reverse('posts:events'), params,
+                                       HTTP_LAST_EVENT_ID='0')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode()
+
+    def test_new_posts_and_comments_published(self):
+        """Новые пост и комментарий попадают в поток после фиксации."""
+        # TestCase не фиксирует транзакцию, поэтому on_commit
+        # выполняется сразу.
+        with mock.patch('posts.signals.transaction.on_commit',
+                        side_effect=lambda callback: callback()):
+            self.client.post(reverse('posts:post_create'),
+                             {'text': 'новый пост'})
+            post = Post.objects.get(text='новый пост')
+            self.client.post(
+                reverse('posts:add_comment', kwargs={'post_id': post.pk}),
+                {'text': 'комментарий'})
+        content = self.read_stream()
+        self.assertIn('event: post', content)
+        self.assertIn('новый пост', content)
+        self.assertNotIn('комментарий', content)
+        content = self.read_stream(post=post.pk)
+        self.assertIn('event: comment', content)
+        self.assertNotIn('event: post', content)
+
+    def test_async_wait_wakes_on_publish(self):
+        """Ожидание без потока просыпается от публикации."""
+
+        async def listen():
+            waiting = asyncio.ensure_future(self.broker.wait_async(0, 5))
+            await asyncio.sleep(0)
+            self.broker.publish('post', {'id': 1})
+            return await waiting
+
+        events = asyncio.run(listen())
+        self.assertEqual([event['id'] for event in events], [1])
+        self.assertEqual(self.broker.wait(1, 0), [])
+
+    def test_pages_subscribe_only_under_asgi(self):
+        """Под WSGI страница не открывает поток, под ASGI открывает."""
+        # Обе страницы для гостя, чтобы ключ кеша отличался только
+        # сервером.
+        self.client.logout()
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'EventSource')
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': reverse('posts:index'),
+            'query_string': b'', 'headers': [(b'host', b'testserver')],
+        }
+        sent = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            sent.append(message)
+
+        with mock.patch.object(constants, 'ASYNC_VIEW_WORKERS', 0):
+            asyncio.run(ASGIHandler()(scope, receive, send))
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn(b'EventSource', b''.join(
+            message.get('body', b'') for message in sent[1:]))
+        # Страница из кеша ASGI-запроса под WSGI не подписывается.
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'EventSource')
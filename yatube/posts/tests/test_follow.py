@@ -0,0 +1,99 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import constants
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class FollowTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='test_author')
+        cls.follower = User.objects.create(username='test_follower')
+        cls.stranger = User.objects.create(username='test_stranger')
+
+    def setUp(self):
+        cache.clear()
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+        self.stranger_client = Client()
+        self.stranger_client.force_login(self.stranger)
+
+    def follow_feed(self, client):
+        response = client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_and_unfollow(self):
+        """Подписка и отписка меняют ленту и счётчик подписчиков."""
+        post = Post.objects.create(author=self.author, text='old post')
+        self.follower_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}))
+        self.assertEqual(self.follow_feed(self.follower_client), [post])
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.followers_count, 1)
+        self.follower_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertEqual(self.follow_feed(self.follower_client), [])
+        self.author.profile.refresh_from_db()
+        self.assertEqual(self.author.profile.followers_count, 0)
+
+    def test_new_post_reaches_only_followers(self):
+        """Новый пост попадает в ленту подписчика, но не чужую."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='new post')
+        self.assertEqual(self.follow_feed(self.follower_client), [post])
+        self.assertEqual(self.follow_feed(self.stranger_client), [])
+
+    def test_cannot_follow_self(self):
+        """На себя подписаться нельзя."""
+        self.follower_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.follower}))
+        self.assertFalse(Follow.objects.filter(
+            user=self.follower, author=self.follower).exists())
+
+    @mock.patch.object(constants, 'FANOUT_FOLLOWERS_LIMIT', 0)
+    def test_popular_author_posts_read_on_request(self):
+        """Посты популярного автора подмешиваются при чтении."""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='new post')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.follow_feed(self.follower_client), [post])
+
+    @mock.patch.object(constants, 'FANOUT_FOLLOWERS_LIMIT', 1)
+    def test_author_crossing_followers_limit_keeps_feeds(self):
+        """Посты, вышедшие выше порога подписчиков, остаются в лентах
+        после возврата под порог."""
+        old_post = Post.objects.create(author=self.author, text='old post')
+        Follow.objects.create(user=self.stranger, author=self.author)
+        Follow.objects.create(user=self.follower, author=self.author)
+        new_post = Post.objects.create(author=self.author, text='new post')
+        self.assertEqual(self.follow_feed(self.follower_client),
+                         [new_post, old_post])
+        Follow.objects.get(user=self.stranger, author=self.author).delete()
+        self.assertEqual(
+            set(TimelineEntry.objects.filter(user=self.follower)
+                .values_list('post_id', flat=True)),
+            {old_post.pk, new_post.pk})
+        self.assertEqual(self.follow_feed(self.follower_client),
+                         [new_post, old_post])
+
+    @mock.patch.object(constants, 'FANOUT_FOLLOWERS_LIMIT', 1)
+    @mock.patch.object(constants, 'FANOUT_BACKFILL_POSTS', 1)
+    def test_returning_author_backfills_latest_posts(self):
+        """После возврата под порог в ленты идут только последние посты."""
+        Follow.objects.create(user=self.stranger, author=self.author)
+        Follow.objects.create(user=self.follower, author=self.author)
+        Post.objects.create(author=self.author, text='old post')
+        new_post = Post.objects.create(author=self.author, text='new post')
+        Follow.objects.get(user=self.stranger, author=self.author).delete()
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.follower)
+                 .values_list('post_id', flat=True)),
+            [new_post.pk])
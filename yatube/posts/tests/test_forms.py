@@ -1,5 +1,6 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.conf import settings
@@ -10,13 +11,14 @@ from ..models import Post, Group, Comment
 from ..forms import PostForm
 
 from ..utils import uploaded_img
+from .utils import SyncThumbnailsMixin, ThumbnailStoreMixin
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 User = get_user_model()
 
 
-class PostFormTest(TestCase):
+class PostFormTest(SyncThumbnailsMixin, ThumbnailStoreMixin, TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -44,6 +46,7 @@ class PostFormTest(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        super().setUp()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -100,6 +103,25 @@ class PostFormTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(value, expected)
 
+    def test_post_edit_keeps_comments_count(self):
+        """Правка поста не затирает счётчик комментариев, выросший
+        во время запроса."""
+        full_clean = PostForm.full_clean
+
+        def comment_meanwhile(form):
+            Comment.objects.create(post=self.post, author=self.user,
+                                   text='test comment')
+            full_clean(form)
+
+        with mock.patch.object(PostForm, 'full_clean', comment_meanwhile):
+            self.authorized_client.post(
+                reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+                data={'text': 'test post edit post'},
+            )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'test post edit post')
+        self.assertEqual(self.post.comments_count, 1)
+
 
 class CommentFormTest(TestCase):
     @classmethod
@@ -0,0 +1,61 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..groups import get_groups
+from ..models import Group
+
+User = get_user_model()
+
+
+class GroupDirectoryTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='author')
+        self.client.force_login(self.user)
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='описание')
+
+    def test_group_pages_and_form_without_group_queries(self):
+        """Страница группы и форма поста не запрашивают группы."""
+        get_groups()
+        for url in (reverse('posts:group_list', kwargs={'slug': 'group'}),
+                    reverse('posts:post_create')):
+            with self.subTest(url=url):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(url)
+                self.assertContains(response, 'Группа')
+                self.assertFalse(any(
+                    'posts_group' in query['sql']
+                    for query in context.captured_queries))
+
+    def test_directory_follows_changes(self):
+        """Изменения групп видны в справочнике сразу после фиксации."""
+        self.assertEqual(
+            [group.title for group in get_groups()], ['Группа'])
+        # TestCase не фиксирует транзакцию, поэтому on_commit
+        # выполняется сразу.
+        with mock.patch('posts.signals.transaction.on_commit',
+                        side_effect=lambda callback: callback()):
+            self.group.title = 'Новое название'
+            self.group.save()
+            Group.objects.create(title='Вторая', slug='second',
+                                 description='')
+            self.assertEqual([group.title for group in get_groups()],
+                             ['Новое название', 'Вторая'])
+            self.group.delete()
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'group'}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_directory_waits_for_commit(self):
+        """До фиксации транзакции справочник не сбрасывается."""
+        get_groups()
+        Group.objects.create(title='Вторая', slug='second', description='')
+        self.assertEqual(
+            [group.title for group in get_groups()], ['Группа'])
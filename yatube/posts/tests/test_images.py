@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import constants
+from ..models import ImageJob, Post
+from ..utils import small_gif
+from .utils import SyncThumbnailsMixin
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_KVSTORE_PATH=os.path.join(TEMP_MEDIA_ROOT, 'kvstore.sqlite3'),
+)
+@mock.patch.object(constants, 'IMAGE_WORKERS', 0)
+class ImageJobTest(SyncThumbnailsMixin, TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = User.objects.create(username='author')
+        self.client.force_login(self.user)
+
+    def create_post(self, name, content):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': 'post with image',
+            'image': SimpleUploadedFile(name, content),
+        })
+
+    def job_status(self, job):
+        return self.client.get(reverse(
+            'posts:image_job', kwargs={'job_id': job.pk})).json()
+
+    def test_post_published_after_processing(self):
+        """Пост с картинкой публикуется после обработки картинки."""
+        self.create_post('small.gif', small_gif)
+        post = Post.objects.get()
+        job = ImageJob.objects.get()
+        self.assertRegex(post.image.name, r'^posts/\w\w/\w{64}\.gif$')
+        self.assertEqual(self.job_status(job), {
+            'status': ImageJob.DONE, 'error': '', 'post': post.pk})
+        self.assertFalse(job.upload)
+
+    def test_invalid_image_fails_job(self):
+        """Файл, не являющийся картинкой, не публикует пост."""
+        self.create_post('broken.gif', b'not an image')
+        self.assertFalse(Post.objects.exists())
+        job = ImageJob.objects.get()
+        self.assertEqual(self.job_status(job)['status'], ImageJob.FAILED)
+        response = self.client.get(reverse(
+            'posts:profile', kwargs={'username': self.user.username}))
+        self.assertContains(response, 'Файл не является картинкой')
+
+    def test_job_changes_refresh_cached_profile(self):
+        """Новая задача и смена её статуса видны в закэшированном
+        профиле автора."""
+        url = reverse('posts:profile', kwargs={'username': self.user.username})
+        self.client.get(url)
+        with mock.patch.object(constants, 'IMAGE_WORKERS', 1):
+            self.create_post('small.gif', small_gif)
+        self.assertContains(self.client.get(url), 'Пост с картинкой')
+        job = ImageJob.objects.get()
+        job.status = ImageJob.FAILED
+        job.error = 'Ошибка обработки'
+        job.save()
+        self.assertContains(self.client.get(url), 'Ошибка обработки')
+
+    @mock.patch.object(constants, 'IMAGE_MAX_SIZE', (20, 20))
+    def test_image_normalized(self):
+        """Картинка уменьшается, поворачивается по EXIF и теряет EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: поворот на 90 градусов.
+        output = BytesIO()
+        Image.new('RGB', (80, 40)).save(output, 'JPEG', exif=exif)
+        self.create_post('photo.jpeg', output.getvalue())
+        image = Image.open(Post.objects.get().image)
+        self.assertEqual(image.size, (10, 20))
+        self.assertNotIn('exif', image.info)
+
+    def test_processing_off_request_thread(self):
+        """С пулом потоков запрос только ставит задачу в очередь."""
+        with mock.patch.object(constants, 'IMAGE_WORKERS', 1):
+            self.create_post('small.gif', small_gif)
+        self.assertFalse(Post.objects.exists())
+        job = ImageJob.objects.get()
+        self.assertEqual(self.job_status(job)['status'], ImageJob.PENDING)
+
+    def test_edit_keeps_image_until_processed(self):
+        """При редактировании старая картинка остаётся до обработки новой."""
+        post = Post.objects.create(
+            author=self.user, text='text',
+            image=SimpleUploadedFile('old.gif', small_gif))
+        old_name = post.image.name
+        output = BytesIO()
+        Image.new('RGB', (3, 3)).save(output, 'PNG')
+        with mock.patch.object(constants, 'IMAGE_WORKERS', 1):
+            self.client.post(
+                reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+                {'text': 'edited', 'image': SimpleUploadedFile(
+                    'new.png', output.getvalue())})
+        post.refresh_from_db()
+        self.assertEqual((post.text, post.image.name), ('edited', old_name))
+        call_command('process_image_jobs', '--stale-minutes', '0',
+                     stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(post.image.name.endswith('.png'))
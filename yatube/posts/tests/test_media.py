@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..media import delete_file, find_garbage
+from ..models import MediaFile, Post
+from ..thumbnails import generate_feed_thumbnail
+from ..utils import small_gif
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_KVSTORE_PATH=os.path.join(TEMP_MEDIA_ROOT, 'kvstore.sqlite3'),
+)
+class MediaStorageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.user = User.objects.create(username='author')
+
+    def create_post(self, name, content=small_gif):
+        return Post.objects.create(
+            author=self.user, text='text',
+            image=SimpleUploadedFile(name, content))
+
+    def test_identical_images_share_file(self):
+        """Одинаковые картинки хранятся одним файлом со счётчиком ссылок."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            MediaFile.objects.get(name=first.image.name).refs, 2)
+        first.delete()
+        self.assertEqual(
+            MediaFile.objects.get(name=second.image.name).refs, 1)
+
+    def test_collect_media_removes_orphans(self):
+        """collect_media удаляет картинки без постов и их миниатюры."""
+        kept = self.create_post('kept.gif')
+        removed = self.create_post('removed.gif', small_gif + b'\0')
+        storage = removed.image.storage
+        thumbnail = generate_feed_thumbnail(removed.image.name)
+        removed.delete()
+        stray = storage.save('posts/stray.gif', ContentFile(b'stray'))
+        out = StringIO()
+        call_command('collect_media', '--grace-hours', '0', stdout=out)
+        self.assertIn('удалено: 2', out.getvalue())
+        self.assertTrue(storage.exists(kept.image.name))
+        self.assertFalse(storage.exists(removed.image.name))
+        self.assertFalse(storage.exists(stray))
+        self.assertFalse(thumbnail.exists())
+        self.assertFalse(MediaFile.objects.filter(
+            name=removed.image.name).exists())
+
+    def test_reuploaded_orphan_survives_collection(self):
+        """Сирота, загруженный заново, не удаляется до сохранения поста."""
+        post = self.create_post('orphan.gif')
+        name, storage = post.image.name, post.image.storage
+        post.delete()
+        day_ago = timezone.now() - timedelta(days=1)
+        MediaFile.objects.filter(name=name).update(created=day_ago)
+        os.utime(storage.path(name),
+                 (day_ago.timestamp(), day_ago.timestamp()))
+        self.assertEqual(storage.save('posts/again.gif',
+                                      ContentFile(small_gif)), name)
+        older_than = timezone.now() - timedelta(hours=1)
+        self.assertNotIn(name, list(find_garbage(older_than)))
+        self.assertFalse(delete_file(name, older_than))
+        self.assertTrue(storage.exists(name))
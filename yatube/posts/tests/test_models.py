@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Comment, Group, Post, Profile
 from .. import constants
 
 User = get_user_model()
@@ -31,3 +34,50 @@ class PostModelTest(TestCase):
         for model_type, expected_str in str_names.items():
             with self.subTest():
                 self.assertEqual(str(model_type), expected_str)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='counter_author')
+        cls.post = Post.objects.create(author=cls.user, text='test post')
+
+    def test_posts_count_follows_posts(self):
+        """Счётчик постов автора меняется при создании и удалении."""
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.posts_count, 1)
+        extra_post = Post.objects.create(author=self.user, text='extra')
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.posts_count, 2)
+        extra_post.delete()
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.posts_count, 1)
+
+    def test_comments_count_follows_comments(self):
+        """Счётчик комментариев поста меняется вместе с комментариями."""
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='comment')
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+
+    def test_reconcile_counters_fixes_drift(self):
+        """Команда reconcile_counters исправляет рассинхронизацию."""
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+        Profile.objects.filter(user=self.user).update(posts_count=7)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.post.refresh_from_db()
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 0)
+        self.assertEqual(self.user.profile.posts_count, 1)
+
+
+class FeedIndexesTest(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не читают таблицы целиком и не сортируют строки."""
+        out = StringIO()
+        call_command('explain_feeds', '--strict', stdout=out)
+        self.assertIn('Проблемных планов: 0', out.getvalue())
@@ -0,0 +1,45 @@
+import json
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import constants
+from ..models import Post
+
+User = get_user_model()
+
+
+class PerformanceMiddlewareTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        Post.objects.create(
+            author=User.objects.create(username='author'), text='text')
+
+    @mock.patch.object(constants, 'PERF_SAMPLE_RATE', 1)
+    def test_sampled_request_reports_timings(self):
+        """Замеренный запрос получает Server-Timing и строку лога."""
+        with self.assertLogs('posts.perf', 'INFO') as logs:
+            response = self.client.get(reverse('posts:index'))
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('tpl;dur=', response['Server-Timing'])
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+        self.assertEqual(record['response_bytes'], len(response.content))
+        with self.assertLogs('posts.perf', 'INFO') as logs:
+            self.client.get(reverse('posts:index'))
+        cached = json.loads(logs.records[0].getMessage())
+        self.assertEqual(cached['queries'], 0)
+        self.assertGreater(cached['cache_hits'], 0)
+        self.assertEqual(cached['cache_misses'], 0)
+
+    @mock.patch.object(constants, 'PERF_SAMPLE_RATE', 0)
+    def test_unsampled_request_untouched(self):
+        """Запрос вне выборки не замеряется."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
@@ -0,0 +1,99 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..ratelimit import check_rate_limit
+
+User = get_user_model()
+
+
+class RateLimitTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        self.post = Post.objects.create(author=self.author, text='пост')
+        self.client.force_login(self.author)
+
+    def comment(self, client=None):
+        return (client or self.client).post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'комментарий'})
+
+    @override_settings(POSTS_RATE_LIMITS={'add_comment': {'user': (2, 60)}})
+    def test_user_budget(self):
+        """Сверх бюджета пользователя — 429 с Retry-After."""
+        with mock.patch('posts.ratelimit.time.time', return_value=6000):
+            self.assertEqual(self.comment().status_code, 302)
+            self.assertEqual(self.comment().status_code, 302)
+            response = self.comment()
+        self.assertEqual(response.status_code, 429)
+        # До следующего окна из 60 секунд.
+        self.assertEqual(response['Retry-After'], '60')
+        self.assertEqual(Comment.objects.count(), 2)
+        other = Client()
+        other.force_login(User.objects.create(username='other'))
+        with mock.patch('posts.ratelimit.time.time', return_value=6000):
+            self.assertEqual(self.comment(other).status_code, 302)
+        with mock.patch('posts.ratelimit.time.time', return_value=6059):
+            response = self.comment()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        with mock.patch('posts.ratelimit.time.time', return_value=6060):
+            self.assertEqual(self.comment().status_code, 302)
+            self.assertEqual(self.comment().status_code, 302)
+            self.assertEqual(self.comment().status_code, 429)
+        self.assertEqual(self.client.get(
+            reverse('posts:post_create')).status_code, 200)
+
+    @override_settings(POSTS_RATE_LIMITS={'signup': {'ip': (50, 60)}})
+    def test_parallel_requests_counted_once(self):
+        """Параллельные запросы не получают лишних 429 и не проходят
+        сверх бюджета."""
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.0.1')
+        request.user = AnonymousUser()
+
+        def check(_):
+            return check_rate_limit(request, 'signup')
+
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        shared = {'default': {
+            'BACKEND': 'posts.cache_backends.SQLiteCache',
+            'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+        }}
+        for caches in (settings.CACHES, shared):
+            with self.subTest(backend=caches['default']['BACKEND']), \
+                    override_settings(CACHES=caches), \
+                    mock.patch('posts.ratelimit.time.time',
+                               return_value=6000):
+                cache.clear()
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    results = list(executor.map(check, range(80)))
+                self.assertEqual(results.count(None), 50)
+
+    @override_settings(POSTS_RATE_LIMITS={'signup': {'ip': (1, 60)},
+                                          'post_create': {'ip': (1, 60)}})
+    def test_ip_budget_and_api(self):
+        """Бюджет адреса общий для всех; API отвечает 429 в JSON."""
+        url = reverse('users:signup')
+        self.assertEqual(Client().post(url, {}).status_code, 200)
+        response = Client().post(url, {})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.client.post(
+            reverse('posts:api_posts'), {'text': 'из API'}).status_code, 201)
+        response = self.client.post(reverse('posts:api_posts'),
+                                    {'text': 'ещё'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['retry_after'],
+                         int(response['Retry-After']))
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post, Profile
+from ..routers import PIN_COOKIE, ReplicaRouter
+
+User = get_user_model()
+
+
+@override_settings(POSTS_READ_REPLICAS=['replica'])
+class ReplicaRoutingTest(TestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(username='author')
+        self.post = Post.objects.create(author=self.user, text='synced post')
+        # Реплика — отдельная база, и в неё попадает только то, что
+        # успело «доехать»; второй пост есть лишь в основной базе.
+        User.objects.using('replica').bulk_create(
+            [User(pk=self.user.pk, username=self.user.username)])
+        Profile.objects.using('replica').bulk_create(
+            [Profile(user_id=self.user.pk, posts_count=1)])
+        Post.objects.using('replica').bulk_create([Post(
+            pk=self.post.pk, author_id=self.user.pk, text=self.post.text,
+            pub_date=self.post.pub_date)])
+        self.lagging = Post.objects.create(author=self.user,
+                                           text='lagging post')
+
+    def get(self, client, url):
+        cache.clear()
+        return client.get(url)
+
+    def test_router_outside_views(self):
+        """Вне помеченных view чтение и запись идут в основную базу."""
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_post_reads_go_to_replica(self):
+        """Страница поста читается с отстающей реплики."""
+        response = self.get(self.client, reverse(
+            'posts:post_detail', kwargs={'post_id': self.lagging.pk}))
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached_feeds_read_from_primary(self):
+        """Страницы для общего кэша не рисуются по отстающей реплике."""
+        for url in (reverse('posts:index'),
+                    reverse('posts:profile', kwargs={'username': 'author'})):
+            with self.subTest(url=url):
+                response = self.get(self.client, url)
+                self.assertContains(response, 'lagging post')
+                # Из кэша её получает и следующий клиент.
+                response = Client().get(url)
+                self.assertContains(response, 'lagging post')
+
+    def test_reads_after_write_stay_on_primary(self):
+        """После своей записи клиент читает из основной базы."""
+        url = reverse('posts:post_detail',
+                      kwargs={'post_id': self.lagging.pk})
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {'text': 'comment'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(Client().get(url).status_code, 404)
+        # Без cookie тот же клиент снова читает с реплики.
+        del self.client.cookies[PIN_COOKIE]
+        self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import ContainsSearchBackend, get_search_backend
+
+User = get_user_model()
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='test_username')
+        cls.post_cats = Post.objects.create(
+            author=cls.user, text='Кошки любят спать на солнце')
+        cls.post_dogs = Post.objects.create(
+            author=cls.user, text='Собаки любят гулять')
+
+    def search(self, query):
+        response = self.client.get(reverse('posts:search'), {'q': query})
+        return list(response.context['page_obj'] or [])
+
+    def test_search_finds_posts_by_words(self):
+        """Поиск находит посты по словам и их началу."""
+        self.assertEqual(self.search('кошки'), [self.post_cats])
+        self.assertEqual(self.search('соба'), [self.post_dogs])
+        self.assertEqual(len(self.search('любят')), 2)
+
+    def test_search_index_follows_post_changes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        self.post_dogs.text = 'Собаки любят кошек'
+        self.post_dogs.save()
+        self.assertIn(self.post_dogs, self.search('кошек'))
+        self.post_dogs.delete()
+        self.assertEqual(self.search('собаки'), [])
+
+    def test_search_ignores_query_syntax(self):
+        """Служебные символы в запросе не ломают поиск."""
+        for query in ('"', 'NEAR(', 'кошки OR', '*'):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    reverse('posts:search'), {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_other_databases_search_by_substring(self):
+        """Для СУБД без своего бэкенда поиск идёт по подстроке."""
+        with mock.patch.object(connection, 'vendor', 'mysql'):
+            backend = get_search_backend()
+        self.assertIsInstance(backend, ContainsSearchBackend)
+        self.assertEqual(backend.search('Собаки гулять', 10),
+                         [self.post_dogs.pk])
+        self.assertEqual(backend.search('любят', 10),
+                         [self.post_dogs.pk, self.post_cats.pk])
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по индексу."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кошки'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.post_cats])
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Group, Post
+from ..syndication import state_key
+
+User = get_user_model()
+
+
+class SyndicationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(username='author')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='описание')
+        self.post = Post.objects.create(
+            author=self.author, text='первый пост', group=self.group)
+
+    def test_feeds_render(self):
+        """Ленты главной, группы и автора отдаются в RSS и Atom."""
+        urls = (
+            reverse('posts:index_feed', args=['rss']),
+            reverse('posts:group_feed', args=['group', 'atom']),
+            reverse('posts:profile_feed', args=['author', 'rss']),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('xml', response['Content-Type'])
+                self.assertContains(response, 'первый пост')
+        self.assertEqual(self.client.get(
+            reverse('posts:index_feed', args=['json'])).status_code, 404)
+        self.assertEqual(self.client.get(
+            reverse('posts:profile_feed', args=['nobody', 'rss'])
+        ).status_code, 404)
+
+    def test_cached_poll_without_queries(self):
+        """Повторный опрос не ходит в БД, 304 — по ETag."""
+        url = reverse('posts:group_feed', args=['group', 'atom'])
+        response = self.client.get(url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(url)
+            not_modified = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_rebuilt_only_for_relevant_changes(self):
+        """Ленту меняют только посты, которые в неё попадают."""
+        group_url = reverse('posts:group_feed', args=['group', 'rss'])
+        index_url = reverse('posts:index_feed', args=['rss'])
+        group_etag = self.client.get(group_url)['ETag']
+        index_etag = self.client.get(index_url)['ETag']
+        Post.objects.create(author=self.author, text='вне группы')
+        self.assertEqual(self.client.get(
+            group_url, HTTP_IF_NONE_MATCH=group_etag).status_code, 304)
+        response = self.client.get(index_url, HTTP_IF_NONE_MATCH=index_etag)
+        self.assertContains(response, 'вне группы')
+        self.post.group = None
+        self.post.save()
+        self.assertNotContains(self.client.get(group_url), 'первый пост')
+
+    def test_author_rename_rebuilds_feeds(self):
+        """Новое имя автора попадает в записи всех его лент."""
+        urls = (
+            reverse('posts:index_feed', args=['rss']),
+            reverse('posts:group_feed', args=['group', 'rss']),
+            reverse('posts:profile_feed', args=['author', 'atom']),
+        )
+        for url in urls:
+            self.client.get(url)
+        self.author.first_name = 'Новое'
+        self.author.last_name = 'Имя'
+        self.author.save()
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Новое Имя')
+
+    def test_unknown_author_leaves_no_state(self):
+        """Лента несуществующего автора не заводит состояние в кеше."""
+        response = self.client.get(
+            reverse('posts:profile_feed', args=['nobody', 'rss']))
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(cache.get(state_key('author:nobody')))
@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default as thumbnail_default
+
+from .. import caching
+from ..kvstore import SQLiteKVStore
+from ..models import Post
+from ..thumbnails import generate_feed_thumbnail
+from ..utils import small_gif
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_KVSTORE_PATH=os.path.join(TEMP_MEDIA_ROOT, 'kvstore.sqlite3'),
+)
+class FeedThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='test_username')
+        cls.posts = [Post.objects.create(
+            author=cls.user,
+            text='test post',
+            image=SimpleUploadedFile(
+                name='thumbnail.gif',
+                content=small_gif,
+                content_type='image/gif'
+            ),
+        ) for i in range(3)]
+        cls.post = cls.posts[-1]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        thumbnail_default.kvstore.clear()
+
+    @mock.patch('posts.thumbnails.schedule_feed_thumbnail',
+                return_value=None)
+    def test_placeholder_until_thumbnail_ready(self, schedule):
+        """Пока миниатюры нет, лента показывает заглушку и ставит задачу."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'bg-light')
+        self.assertNotContains(response, '<img class="card-img')
+        schedule.assert_called_with(self.posts[0].image.name)
+
+    def test_thumbnail_shown_when_ready(self):
+        """Готовые миниатюры выводятся в ленте."""
+        for post in self.posts:
+            generate_feed_thumbnail(post.image.name)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '<img class="card-img', count=3)
+        self.assertNotContains(response, 'bg-light')
+
+    def test_feed_thumbnails_resolved_in_one_lookup(self):
+        """Все миниатюры страницы ищутся одним запросом к хранилищу."""
+        for post in self.posts:
+            generate_feed_thumbnail(post.image.name)
+        with mock.patch.object(
+                SQLiteKVStore, '_get_many_raw',
+                autospec=True,
+                side_effect=SQLiteKVStore._get_many_raw) as get_many_raw:
+            self.client.get(reverse('posts:index'))
+        self.assertEqual(get_many_raw.call_count, 1)
+
+    @mock.patch('posts.thumbnails.schedule_feed_thumbnail',
+                return_value=None)
+    def test_ready_thumbnail_forgets_only_its_pages(self, schedule):
+        """Готовая миниатюра обновляет страницы с заглушкой, не меняя
+        версию лент."""
+        self.client.get(reverse('posts:index'))
+        version = caching.get_feed_version()
+        for post in self.posts:
+            generate_feed_thumbnail(post.image.name)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, '<img class="card-img', count=3)
+        self.assertEqual(caching.get_feed_version(), version)
+
+    @mock.patch('posts.thumbnails.schedule_feed_thumbnail',
+                return_value=None)
+    def test_placeholder_page_without_validators(self, schedule):
+        """Страницы с заглушкой вместо миниатюры отдаются без ETag."""
+        urls = (reverse('posts:index'),
+                reverse('posts:post_detail',
+                        kwargs={'post_id': self.post.pk}))
+        for url in urls:
+            with self.subTest(url=url):
+                for _ in range(2):
+                    self.assertFalse(self.client.get(url).has_header('ETag'))
+        for post in self.posts:
+            generate_feed_thumbnail(post.image.name)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertTrue(self.client.get(url).has_header('ETag'))
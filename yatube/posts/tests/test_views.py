@@ -1,5 +1,6 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
@@ -8,17 +9,20 @@ from django.urls import reverse
 from django.conf import settings
 from django import forms
 
-from ..import constants
-from ..models import Group, Post
+from ..import caching, constants
+from ..models import Comment, Group, Post, Profile
 
+from ..groups import get_groups
 from ..utils import uploaded_img
+from .utils import (QueryBudgetMixin, SyncThumbnailsMixin,
+                    ThumbnailStoreMixin)
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 User = get_user_model()
 
 
-class PostsViewTests(TestCase):
+class PostsViewTests(SyncThumbnailsMixin, ThumbnailStoreMixin, TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -41,6 +45,8 @@ class PostsViewTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        super().setUp()
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -68,7 +74,7 @@ class PostsViewTests(TestCase):
                 self.assertTemplateUsed(response, template)
 
 
-class PostsPagesTest(TestCase):
+class PostsPagesTest(SyncThumbnailsMixin, ThumbnailStoreMixin, TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
@@ -91,6 +97,8 @@ class PostsPagesTest(TestCase):
         )
 
     def setUp(self):
+        super().setUp()
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -210,10 +218,7 @@ class PostsPagesTest(TestCase):
     def test_index_cache(self):
         """Главная страница кэшируется"""
         response_first = self.authorized_client.get(reverse('posts:index'))
-        Post.objects.create(
-            author=self.user,
-            text='test post',
-        )
+        Post.objects.filter(pk=self.post.pk).update(text='changed text')
         response_second = self.authorized_client.get(
             (reverse('posts:index'))
         )
@@ -226,6 +231,59 @@ class PostsPagesTest(TestCase):
         self.assertNotEqual(response_first.content,
                             response_after_clear.content)
 
+    def test_post_card_cache_lifetime(self):
+        """Карточка поста живёт в кэше POST_CARD_CACHE_SECONDS."""
+        for seconds, text in ((constants.POST_CARD_CACHE_SECONDS, 'old'),
+                              (0, 'new')):
+            with self.subTest(seconds=seconds):
+                cache.clear()
+                Post.objects.filter(pk=self.post.pk).update(text='old')
+                with mock.patch.object(
+                        constants, 'POST_CARD_CACHE_SECONDS', seconds):
+                    self.authorized_client.get(reverse('posts:index'))
+                    Post.objects.filter(pk=self.post.pk).update(text='new')
+                    caching.bump_feed_version()
+                    response = self.authorized_client.get(
+                        reverse('posts:index'))
+                self.assertEqual(
+                    response.context['post_card_cache_seconds'], seconds)
+                self.assertContains(response, f'<p>{text}</p>', html=True)
+
+    def test_new_post_invalidates_index_cache(self):
+        """Новый пост сбрасывает кэш главной страницы."""
+        response_first = self.authorized_client.get(reverse('posts:index'))
+        Post.objects.create(
+            author=self.user,
+            text='test post',
+        )
+        response_second = self.authorized_client.get(
+            reverse('posts:index')
+        )
+        self.assertNotEqual(response_first.content,
+                            response_second.content)
+
+    def test_author_rename_invalidates_cache(self):
+        """Новое имя автора сразу видно в закэшированной ленте."""
+        self.authorized_client.get(reverse('posts:index'))
+        self.user.first_name = 'Переименованный'
+        self.user.save()
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Переименованный')
+
+    def test_post_detail_without_profile(self):
+        """Пост автора без профиля открывается с нулевым счётчиком."""
+        Profile.objects.filter(user=self.user).delete()
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['count'], 0)
+
+    def test_cache_separates_anonymous_and_authorized(self):
+        """Гость не получает страницу, закэшированную для пользователя."""
+        self.authorized_client.get(reverse('posts:index'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, self.user.username)
+
 
 class PaginatorViewsTest(TestCase):
     @classmethod
@@ -246,6 +304,8 @@ class PaginatorViewsTest(TestCase):
                            + constants.POSTS_PER_SECOND_PAGE)]
 
     def setUp(self):
+        super().setUp()
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(PaginatorViewsTest.user)
 
@@ -295,3 +355,103 @@ class PaginatorViewsTest(TestCase):
         self.assertEqual(len(response.context['page_obj']),
                             (constants.POSTS_PER_SECOND_PAGE),
                          )
+
+    def test_next_cursor_leads_to_second_page(self):
+        """Токен следующей страницы ведёт на вторую страницу."""
+        response = self.authorized_client.get(reverse('posts:index'))
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': next_cursor})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), constants.POSTS_PER_SECOND_PAGE)
+        self.assertEqual(page_obj.number, 2)
+        self.assertFalse(page_obj.has_next())
+
+    def test_previous_cursor_leads_to_first_page(self):
+        """Токен предыдущей страницы возвращает на первую страницу."""
+        first_page = self.authorized_client.get(
+            reverse('posts:index')).context['page_obj']
+        second_page = self.authorized_client.get(
+            reverse('posts:index'),
+            {'cursor': first_page.next_cursor}).context['page_obj']
+        response = self.authorized_client.get(
+            reverse('posts:index'),
+            {'cursor': second_page.previous_cursor})
+        self.assertEqual(list(response.context['page_obj']),
+                         list(first_page))
+        self.assertFalse(response.context['page_obj'].has_previous())
+
+    def test_offset_pages_keep_page_numbers(self):
+        """По ?page=N выводятся номера страниц и ссылка на последнюю."""
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'page': 1})
+        self.assertContains(response, 'href="?page=2"', count=2)
+        self.assertContains(response, 'Последняя')
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Последняя')
+        self.assertNotContains(response, '?page=')
+
+    def test_capped_count_hides_page_numbers(self):
+        """Если счёт упёрся в лимит, номеров и последней страницы нет."""
+        with mock.patch.object(constants, 'PAGINATOR_COUNT_LIMIT',
+                               constants.POSTS_PER_PAGE):
+            response = self.authorized_client.get(
+                reverse('posts:index'), {'page': 2})
+        self.assertNotContains(response, 'Последняя')
+        self.assertNotContains(response, 'href="?page=1"')
+        self.assertContains(response, '<span class="page-link">2</span>',
+                            html=True)
+        self.assertContains(response, 'Предыдущая')
+
+    def test_broken_cursor_returns_first_page(self):
+        """Битый токен не ломает страницу."""
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': 'broken'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='test_username')
+        cls.group = Group.objects.create(
+            title='test title',
+            slug='1',
+            description='test description',
+        )
+        cls.posts = [Post.objects.create(
+            author=cls.user,
+            text='test post',
+            group=cls.group,
+        ) for i in range(constants.POSTS_PER_PAGE)]
+        cls.commentators = [
+            User.objects.create(username=f'commentator_{i}')
+            for i in range(3)]
+        for commentator in cls.commentators:
+            Comment.objects.create(
+                post=cls.posts[0],
+                author=commentator,
+                text='test comment',
+            )
+
+    def setUp(self):
+        cache.clear()
+        # Справочник групп загружается раз на процесс, а не на запрос.
+        get_groups()
+
+    def test_views_fit_query_budget(self):
+        """Число запросов не зависит от числа постов и комментариев."""
+        # В каждом бюджете один запрос — данные для ETag и Last-Modified.
+        budgets = {
+            reverse('posts:index'): 2,
+            reverse('posts:group_list',
+                    kwargs={'slug': self.group.slug}): 2,
+            reverse('posts:profile',
+                    kwargs={'username': self.user.username}): 3,
+            reverse('posts:post_detail',
+                    kwargs={'post_id': self.posts[0].id}): 3,
+        }
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                self.assertQueryBudget(self.client, url, budget)
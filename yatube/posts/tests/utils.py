@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .. import constants
+
+
+class QueryBudgetMixin:
+    """Проверка, что страница укладывается в бюджет запросов к БД."""
+
+    def assertQueryBudget(self, client, url, budget):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        queries = '\n'.join(query['sql'] for query in context.captured_queries)
+        self.assertLessEqual(
+            len(context), budget,
+            f'{url}: {len(context)} запросов при бюджете {budget}:\n'
+            f'{queries}')
+
+        return response
+
+
+class SyncThumbnailsMixin:
+    """Создаёт миниатюры сразу, без пула потоков."""
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(constants, 'THUMBNAIL_WORKERS', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class ThumbnailStoreMixin:
+    """Хранит сведения о миниатюрах во временном файле, а не в файле
+    разработчика."""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        store = override_settings(THUMBNAIL_KVSTORE_PATH=os.path.join(
+            directory, 'thumbnails.sqlite3'))
+        store.enable()
+        self.addCleanup(store.disable)
@@ -0,0 +1,143 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import constants
+from .caching import (forget_post_fragments, forget_thumbnail_pages,
+                      note_pending_thumbnail)
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+class LookupThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, умеющий искать миниатюры без их генерации."""
+
+    def get_thumbnail_file(self, file_, geometry_string, **options):
+        """Файл миниатюры, который создал бы get_thumbnail."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+
+        return ImageFile(name, default.storage)
+
+    def get_cached_thumbnails(self, files, geometry_string, **options):
+        """Готовые миниатюры для списка файлов одним обращением к хранилищу.
+
+        Возвращает список той же длины; на месте отсутствующих — None.
+        """
+        thumbnails = [
+            self.get_thumbnail_file(file_, geometry_string, **options)
+            for file_ in files
+        ]
+        kvstore = default.kvstore
+        if hasattr(kvstore, 'get_many'):
+            found = kvstore.get_many(thumbnails)
+        else:
+            found = {thumbnail.key: kvstore.get(thumbnail)
+                     for thumbnail in thumbnails}
+
+        return [found[thumbnail.key] for thumbnail in thumbnails]
+
+
+backend = LookupThumbnailBackend()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=constants.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails')
+    return _executor
+
+
+def generate_feed_thumbnail(name, notify=True):
+    """Создаёт миниатюру для лент.
+
+    notify удаляет из кэша карточки постов с этой картинкой
+    и страницы, выведенные без её миниатюры.
+    """
+    close_old_connections()
+    try:
+        # Хранилище картинок постов входит в ключ миниатюры sorl.
+        source = ImageFile(name, Post._meta.get_field('image').storage)
+        thumbnail = get_thumbnail(source, constants.FEED_THUMBNAIL_GEOMETRY,
+                                  **constants.FEED_THUMBNAIL_OPTIONS)
+        if notify:
+            forget_post_fragments(*Post.objects.filter(image=name)
+                                  .values_list('pk', flat=True))
+            forget_thumbnail_pages(name)
+        return thumbnail
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+        return None
+    finally:
+        with _lock:
+            _pending.discard(name)
+        close_old_connections()
+
+
+def schedule_feed_thumbnail(name):
+    """Ставит создание миниатюры в очередь пула потоков.
+
+    Повторные вызовы для ещё не обработанного файла игнорируются.
+    Если THUMBNAIL_WORKERS равен нулю, миниатюра создаётся сразу
+    и возвращается вызывающему.
+    """
+    if not name:
+        return None
+    if not constants.THUMBNAIL_WORKERS:
+        return generate_feed_thumbnail(name, notify=False)
+    with _lock:
+        if name in _pending:
+            return None
+        _pending.add(name)
+    get_executor().submit(generate_feed_thumbnail, name)
+
+    return None
+
+
+def attach_feed_thumbnails(posts):
+    """Проставляет постам атрибут feed_thumbnail.
+
+    Все миниатюры страницы ищутся одним запросом к хранилищу sorl;
+    для отсутствующих планируется создание.
+    """
+    posts = [post for post in posts if post.image]
+    thumbnails = backend.get_cached_thumbnails(
+        [post.image for post in posts], constants.FEED_THUMBNAIL_GEOMETRY,
+        **constants.FEED_THUMBNAIL_OPTIONS)
+    for post, thumbnail in zip(posts, thumbnails):
+        if thumbnail is None:
+            thumbnail = schedule_feed_thumbnail(post.image.name)
+        if thumbnail is None:
+            note_pending_thumbnail(post.image.name)
+        post.feed_thumbnail = thumbnail
+
+
+def get_feed_thumbnail(post):
+    """Готовая миниатюра поста для лент или None."""
+    if not hasattr(post, 'feed_thumbnail'):
+        attach_feed_thumbnails([post])
+
+    return getattr(post, 'feed_thumbnail', None)
@@ -0,0 +1,115 @@
+from itertools import islice
+
+from django.db.models import Q
+
+from . import constants
+from .models import Follow, Post, Profile, TimelineEntry
+
+
+def is_fan_out_author(author_id):
+    """Раскладывать ли посты автора по лентам подписчиков при записи.
+
+    У авторов с числом подписчиков больше FANOUT_FOLLOWERS_LIMIT
+    посты в ленты не копируются, а подмешиваются при чтении.
+    """
+    followers = (Profile.objects.filter(user_id=author_id)
+                 .values_list('followers_count', flat=True).first())
+
+    return (followers or 0) <= constants.FANOUT_FOLLOWERS_LIMIT
+
+
+def _bulk_add(entries):
+    while True:
+        batch = list(islice(entries, constants.FANOUT_BATCH_SIZE))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты подписчиков автора."""
+    if not is_fan_out_author(post.author_id):
+        return
+    followers = (Follow.objects.filter(author_id=post.author_id)
+                 .values_list('user_id', flat=True).iterator())
+    _bulk_add(TimelineEntry(user_id=user_id, post_id=post.pk)
+              for user_id in followers)
+
+
+def fan_out_posts(posts):
+    """Раскладывает по лентам посты выборки posts, например после импорта."""
+    followers = {}
+
+    def entries():
+        for post_id, author_id in (posts.order_by()
+                                   .values_list('pk', 'author_id')
+                                   .iterator()):
+            if author_id not in followers:
+                followers[author_id] = (
+                    list(Follow.objects.filter(author_id=author_id)
+                         .values_list('user_id', flat=True))
+                    if is_fan_out_author(author_id) else [])
+            for user_id in followers[author_id]:
+                yield TimelineEntry(user_id=user_id, post_id=post_id)
+
+    _bulk_add(entries())
+
+
+def fan_out_follow(follow):
+    """Копирует посты автора в ленту нового подписчика."""
+    if not is_fan_out_author(follow.author_id):
+        return
+    posts = (Post.objects.filter(author_id=follow.author_id).order_by()
+             .values_list('pk', flat=True).iterator())
+    _bulk_add(TimelineEntry(user_id=follow.user_id, post_id=post_id)
+              for post_id in posts)
+
+
+def fan_out_returning_author(author_id):
+    """Дополняет ленты подписчиков автора, вернувшегося к раскладке.
+
+    Пока подписчиков было больше FANOUT_FOLLOWERS_LIMIT, новые посты
+    и новые подписчики в ленты не попадали. Когда их снова становится
+    FANOUT_FOLLOWERS_LIMIT, в ленты добавляются FANOUT_BACKFILL_POSTS
+    последних постов автора: отписка не должна писать в ленты весь
+    архив автора.
+    """
+    followers = (Profile.objects.filter(user_id=author_id)
+                 .values_list('followers_count', flat=True).first())
+    if followers == constants.FANOUT_FOLLOWERS_LIMIT:
+        latest = list(Post.objects.filter(author_id=author_id)
+                      .order_by('-pub_date', '-pk')
+                      .values_list('pk', flat=True)
+                      [:constants.FANOUT_BACKFILL_POSTS])
+        fan_out_posts(Post.objects.filter(pk__in=latest))
+
+
+def remove_follow(follow):
+    """Убирает посты автора из ленты бывшего подписчика."""
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.author_id).delete()
+
+
+def get_follow_posts(user):
+    """Посты авторов, на которых подписан user.
+
+    Посты обычных авторов берутся из предвычисленной ленты,
+    посты популярных авторов — напрямую по подпискам.
+    """
+    pushed = Q(pk__in=TimelineEntry.objects.filter(user=user)
+               .values('post_id'))
+    pulled_authors = list(
+        Follow.objects.filter(
+            user=user,
+            author__profile__followers_count__gt=(
+                constants.FANOUT_FOLLOWERS_LIMIT))
+        .values_list('author_id', flat=True))
+    if not pulled_authors:
+        return Post.objects.filter(pushed)
+
+    return Post.objects.filter(pushed | Q(author_id__in=pulled_authors))
+
+
+def get_follow_posts_on_read(user):
+    """Посты подписок без предвычисленной ленты; для сравнения."""
+    return Post.objects.filter(author__following__user=user)
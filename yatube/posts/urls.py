@@ -1,18 +1,53 @@
 from django.urls import path
 
-from . import views
+from . import api, events, syndication, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
+    path('group/<slug:slug>/feed/<str:feed_format>/',
+         syndication.group_feed,
+         name='group_feed'
+         ),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/feed/<str:feed_format>/',
+         syndication.profile_feed,
+         name='profile_feed'
+         ),
+    path('profile/<str:username>/follow/',
+         views.profile_follow,
+         name='profile_follow'
+         ),
+    path('profile/<str:username>/unfollow/',
+         views.profile_unfollow,
+         name='profile_unfollow'
+         ),
+    path('follow/', views.follow_index, name='follow_index'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/comments/',
+         views.comments_more,
+         name='comments_more'
+         ),
     path('posts/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'
          ),
+    path('uploads/<int:job_id>/', views.image_job, name='image_job'),
+    path('search/', views.search, name='search'),
+    path('feed/<str:feed_format>/', syndication.index_feed,
+         name='index_feed'),
+    path('events/', events.events, name='events'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('', views.index, name='index'),
+    path('api/posts/', api.posts, name='api_posts'),
+    path('api/posts/<int:post_id>/', api.post, name='api_post'),
+    path('api/posts/<int:post_id>/comments/',
+         api.comments,
+         name='api_comments'
+         ),
+    path('api/groups/', api.groups, name='api_groups'),
+    path('api/groups/<slug:slug>/', api.group, name='api_group'),
+    path('api/profiles/<str:username>/', api.profile, name='api_profile'),
 ]
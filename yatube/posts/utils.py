@@ -1,18 +1,60 @@
-from django.core.paginator import Paginator
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.paginator import Paginator
 
 from . import constants
+from .groups import attach_groups
+from .models import Post, Profile
+from .paginator import KeysetPaginator
+from .search import get_search_backend
+from .thumbnails import attach_feed_thumbnails
+
+
+def get_profile(user):
+    """Профиль со счётчиками; у пользователя без профиля — нулевой."""
+    try:
+        return user.profile
+    except Profile.DoesNotExist:
+        return Profile(user=user)
 
 
 def get_page_context(post_list, request):
     """Пагинация для шаблонов страниц."""
-    paginator = Paginator(post_list, constants.POSTS_PER_PAGE)
+    paginator = KeysetPaginator(post_list, constants.POSTS_PER_PAGE)
+    cursor = request.GET.get('cursor')
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    if cursor is None and page_number is not None:
+        page_obj = paginator.get_page(page_number)
+    else:
+        page_obj = paginator.get_cursor_page(cursor)
+    attach_groups(page_obj.object_list)
+    attach_feed_thumbnails(page_obj.object_list)
 
     return page_obj
 
 
+def get_search_page(query, request):
+    """Пагинация результатов поиска в порядке релевантности."""
+    ids = get_search_backend().search(query, constants.SEARCH_RESULTS_LIMIT)
+    paginator = Paginator(ids, constants.POSTS_PER_PAGE)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    posts = Post.objects.for_feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts]
+    attach_groups(page_obj.object_list)
+    attach_feed_thumbnails(page_obj.object_list)
+
+    return page_obj
+
+
+def get_comments_page(post, cursor=None):
+    """Порция комментариев поста, от новых к старым."""
+    paginator = KeysetPaginator(post.comments.for_detail(),
+                                constants.COMMENTS_PER_PAGE,
+                                date_field='created')
+
+    return paginator.get_cursor_page(cursor)
+
+
 small_gif = (
     b'\x47\x49\x46\x38\x39\x61\x02\x00'
     b'\x01\x00\x80\x00\x00\x00\x00\x00'
@@ -1,14 +1,32 @@
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.template.loader import render_to_string
+from django.views.decorators.http import require_GET
 
-from .models import Post, Group, User
+from . import async_views
+from .models import Follow, ImageJob, Post, User
 from .forms import PostForm, CommentForm
-from .utils import get_page_context
-
-
+from .asgi import async_variant
+from .caching import (cache_feed_page, conditional_feed_page,
+                      conditional_post_page)
+from .groups import get_group_or_404
+from .images import submit_image_job
+from .ratelimit import rate_limit
+from .routers import read_from_replica
+from .thumbnails import attach_feed_thumbnails
+from .timeline import get_follow_posts
+from .utils import (get_comments_page, get_page_context, get_profile,
+                    get_search_page)
+
+
+@read_from_replica
+@conditional_feed_page
+@cache_feed_page
+@async_variant(async_views.index)
 def index(request):
     """Выводит шаблон главной страницы."""
-    post_list = Post.objects.select_related('author', 'group')
+    post_list = Post.objects.for_feed()
     page_obj = get_page_context(post_list, request)
     context = {
         'page_obj': page_obj,
@@ -17,10 +35,14 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@read_from_replica
+@conditional_feed_page
+@cache_feed_page
+@async_variant(async_views.group_posts)
 def group_posts(request, slug):
     """Выводит шаблон с постами группы."""
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author').all()
+    group = get_group_or_404(slug)
+    post_list = group.posts.for_feed()
     page_obj = get_page_context(post_list, request)
     context = {
         'group': group,
@@ -30,25 +52,53 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica
+@conditional_feed_page
+@cache_feed_page
+@async_variant(async_views.profile)
 def profile(request, username):
     """Выводит страницу профиля пользователя."""
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    author = get_object_or_404(User.objects.select_related('profile'),
+                               username=username)
+    post_list = author.posts.for_feed()
     page_obj = get_page_context(post_list, request)
+    following = (request.user.is_authenticated
+                 and Follow.objects.filter(user=request.user,
+                                           author=author).exists())
+    image_jobs = (author.image_jobs.exclude(status=ImageJob.DONE)
+                  .order_by('-created')
+                  if request.user == author else ())
     context = {
         'author': author,
         'page_obj': page_obj,
+        'following': following,
+        'image_jobs': image_jobs,
     }
 
     return render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    """Выводит посты, найденные по тексту запроса."""
+    query = request.GET.get('q', '').strip()
+    page_obj = get_search_page(query, request) if query else None
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+
+    return render(request, 'posts/search.html', context)
+
+
+@read_from_replica
+@conditional_post_page
+@async_variant(async_views.post_detail)
 def post_detail(request, post_id):
     """Выводит страницу отдельно взятого поста."""
-    post_object = get_object_or_404(Post.objects.select_related(
-        'group', 'author'), id=post_id)
-    comments = post_object.comments.all()
-    count = post_object.author.posts.count()
+    post_object = get_object_or_404(Post.objects.for_detail(), id=post_id)
+    attach_feed_thumbnails([post_object])
+    comments = get_comments_page(post_object, request.GET.get('comments'))
+    count = get_profile(post_object.author).posts_count
     form = CommentForm(request.POST or None)
     context = {
         'post': post_object,
@@ -60,7 +110,19 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@require_GET
+def comments_more(request, post_id):
+    """Отдаёт следующую порцию комментариев поста в JSON."""
+    post_object = get_object_or_404(Post.objects.only('pk'), id=post_id)
+    comments = get_comments_page(post_object, request.GET.get('cursor'))
+    html = render_to_string('posts/includes/comment_list.html',
+                            {'comments': comments}, request)
+
+    return JsonResponse({'html': html, 'next': comments.next_cursor})
+
+
 @login_required
+@rate_limit('post_create')
 def post_create(request):
     """Возможность создать новый пост для авторизованного пользователя."""
     form = PostForm(request.POST or None,
@@ -68,7 +130,14 @@ def post_create(request):
     if request.method == 'POST' and form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
-        post.save()
+        image = form.new_image()
+        if image is None:
+            post.save()
+        else:
+            # Пост появится, когда картинка будет обработана.
+            submit_image_job(ImageJob.objects.create(
+                author=request.user, text=post.text, group=post.group,
+                upload=image))
 
         return redirect('posts:profile', request.user.username)
 
@@ -83,6 +152,7 @@ def post_create(request):
 def post_edit(request, post_id):
     """Возможность редактировать пост для авторизованного пользователя."""
     post_object = get_object_or_404(Post, id=post_id)
+    image_name = post_object.image.name
     form = PostForm(request.POST or None,
                     files=request.FILES or None,
                     instance=post_object)
@@ -91,7 +161,16 @@ def post_edit(request, post_id):
         return redirect('posts:post_detail', post_id)
 
     if request.method == 'POST' and form.is_valid():
-        form.save()
+        image = form.new_image()
+        post_object = form.save(commit=False)
+        if image is not None:
+            # Старая картинка остаётся до конца обработки новой.
+            post_object.image = image_name
+        # Счётчики, прочитанные в начале запроса, могли устареть.
+        post_object.save(update_fields=PostForm.Meta.fields)
+        if image is not None:
+            submit_image_job(ImageJob.objects.create(
+                author=request.user, post=post_object, upload=image))
 
         if post_object.author == request.user:
 
@@ -109,6 +188,20 @@ def post_edit(request, post_id):
 
 
 @login_required
+@require_GET
+def image_job(request, job_id):
+    """Отдаёт в JSON состояние обработки загруженной картинки."""
+    job = get_object_or_404(ImageJob, id=job_id, author=request.user)
+
+    return JsonResponse({
+        'status': job.status,
+        'error': job.error,
+        'post': job.post_id,
+    })
+
+
+@login_required
+@rate_limit('add_comment')
 def add_comment(request, post_id):
     """Возможность оставлять комментарии для авторизованного пользователя."""
     post_object = get_object_or_404(Post, id=post_id)
@@ -120,3 +213,34 @@ def add_comment(request, post_id):
         comment.save()
 
     return redirect('posts:post_detail', post_id=post_id)
+
+
+@login_required
+def follow_index(request):
+    """Выводит посты авторов, на которых подписан пользователь."""
+    post_list = get_follow_posts(request.user).for_feed()
+    page_obj = get_page_context(post_list, request)
+    context = {
+        'page_obj': page_obj,
+    }
+
+    return render(request, 'posts/follow.html', context)
+
+
+@login_required
+def profile_follow(request, username):
+    """Подписывает пользователя на автора."""
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+
+    return redirect('posts:profile', username=username)
+
+
+@login_required
+def profile_unfollow(request, username):
+    """Отписывает пользователя от автора."""
+    Follow.objects.filter(user=request.user,
+                          author__username=username).delete()
+
+    return redirect('posts:profile', username=username)
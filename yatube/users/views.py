@@ -1,9 +1,13 @@
 from django.views.generic import CreateView
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
+
+from posts.ratelimit import rate_limit
 
 from .forms import CreationForm
 
 
+@method_decorator(rate_limit('signup'), name='post')
 class SignUp(CreateView):
     """view-класс для работы с моделью CreationForm ."""
 
@@ -0,0 +1,33 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``. Django 2.2 has no ASGI support of its own, so requests
+are served by ``posts.asgi.ASGIHandler``; the event stream is served by
+``posts.events.asgi_events`` without holding a thread per connection.
+
+Run it with any ASGI server, for example::
+
+    uvicorn yatube.asgi:application
+"""
+
+import os
+
+import django
+from django.urls import reverse
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+django.setup(set_prefix=False)
+
+from posts.asgi import ASGIHandler  # noqa: E402
+from posts.events import asgi_events  # noqa: E402
+
+django_application = ASGIHandler()
+events_path = reverse('posts:events')
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == events_path:
+        await asgi_events(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -38,6 +38,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'posts.perf.PerformanceMiddleware',
+    'posts.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -47,12 +49,21 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Панель отладки включается явно: YATUBE_DEBUG_TOOLBAR=1. Она стоит
+# снаружи PerformanceMiddleware, чтобы её работа не попадала в замеры.
+DEBUG_TOOLBAR = DEBUG and os.environ.get('YATUBE_DEBUG_TOOLBAR') == '1'
+
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS += ['debug_toolbar']
+    MIDDLEWARE.insert(0, 'debug_toolbar.middleware.DebugToolbarMiddleware')
+    INTERNAL_IPS = ['127.0.0.1']
+
 ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'posts.perf.DjangoTemplates',
         # Добавлено: Искать шаблоны на уровне проекта
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
@@ -63,6 +74,8 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.context_processors.live_events',
+                'posts.context_processors.post_card_cache',
             ]
         },
     }
@@ -78,8 +91,19 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    },
+    # Реплика для чтения лент. Включается переменной YATUBE_REPLICA_DB
+    # с путём к отдельному файлу, который заполняет sync_replica.
+    # В тестах это отдельная база, чтобы было видно, откуда читали.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('YATUBE_REPLICA_DB',
+                               os.path.join(BASE_DIR, 'db.sqlite3')),
+    },
 }
+DATABASE_ROUTERS = ['posts.routers.ReplicaRouter']
+POSTS_READ_REPLICAS = (['replica'] if os.environ.get('YATUBE_REPLICA_DB')
+                       else [])
 
 
 # Password validation
@@ -132,8 +156,28 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# По умолчанию кеш в памяти каждого процесса. YATUBE_CACHE=sqlite
+# включает общий для всех процессов кеш: файл SQLite рядом с базой.
+# Ключи начинаются с номера релиза, поэтому выкладка новой версии
+# разом делает недействительным всё, что закэшировала старая.
+CACHE_BACKENDS = {
+    'sqlite': {
+        'BACKEND': 'posts.cache_backends.SQLiteCache',
+        'LOCATION': os.environ.get(
+            'YATUBE_CACHE_PATH', os.path.join(BASE_DIR, 'cache.sqlite3')),
+        'OPTIONS': {'MAX_ENTRIES': 10000, 'POOL_SIZE': 8},
+    },
+    'locmem': {
+        'BACKEND': 'posts.perf.LocMemCache',
+    },
+}
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        **CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')],
+        'KEY_PREFIX': os.environ.get('YATUBE_RELEASE', 'dev'),
     }
 }
+
+THUMBNAIL_KVSTORE = 'posts.kvstore.SQLiteKVStore'
+THUMBNAIL_KVSTORE_PATH = os.path.join(BASE_DIR, 'thumbnails.sqlite3')
@@ -0,0 +1,38 @@
+"""Настройки для боевого сервера.
+
+Использование: DJANGO_SETTINGS_MODULE=yatube.settings_production.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, TEMPLATES
+
+DEBUG = False
+DEBUG_TOOLBAR = False
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app != 'debug_toolbar']
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE
+              if not middleware.startswith('debug_toolbar.')]
+
+# Шаблоны компилируются один раз и берутся из памяти процесса.
+# Процессор debug не нужен без DEBUG. messages нужен админке,
+# а хранилище сообщений читается, только когда его перебирают.
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        'debug': False,
+        'loaders': [
+            ('django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ]),
+        ],
+        'context_processors': [
+            'django.template.context_processors.request',
+            'django.contrib.auth.context_processors.auth',
+            'django.contrib.messages.context_processors.messages',
+            'core.context_processors.year.year',
+            'posts.context_processors.live_events',
+            'posts.context_processors.post_card_cache',
+        ],
+    },
+}]